@@ -1,21 +1,33 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import streamlit as st
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from nltk.sentiment.vader import SentimentIntensityAnalyzer
+import streamlit.components.v1 as components
+from admission import AdmissionController, AdmissionControlledPipeline
+from conversation import Conversation, SessionStore
+from danger import detect_danger
+from locations import load_gazetteer
+from pipeline import create_pipeline, env_flag, env_number
+from prefork import preloaded_pipeline
+from prompts import load_prompts
+from resource_catalog import load_catalog
+from trends import TrendRecorder, TrendStore
 
 # Load environment variables
 load_dotenv()
 
-# Define hate crime types mapping
-HATE_CRIMES_TYPE = {
-    'anti_religious_def.pdf': 'Anti-religious Hate Crime',
-    'racist_def.pdf': 'Racist and Xenophobic Hate Crime',
-    'gender_lgbt_def.pdf': 'Gender and LGBTQI+ Hate Crime'
+# Headline shown for each detected hate crime category (keys from data/resources.json)
+CATEGORY_HEADLINES = {
+    'anti_religious': "### **Unfortunately, you experienced an Anti-Religious Hate Crime**",
+    'racist': "### **Unfortunately, you experienced a Racist and Xenophobic Hate Crime**",
+    'gender_lgbt': "### **Unfortunately, you have experienced a Gender and Anti-LGBTQI+ Hate Crime**"
 }
 
 
+# Cookie that ties a browser to its stored conversation (USAFE_SESSION_DB)
+SESSION_COOKIE = 'usafe_session'
+
+
 # Set page configuration
 st.set_page_config(
     page_title="Usafe",
@@ -42,40 +54,94 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# Step 2: Load vector stores
+# Step 2: Load the models and the vector store
 @st.cache_resource
-def load_vector_store(path):
-    """Load the FAISS vector store."""
-    embedding_model = HuggingFaceEmbeddings(model_name='sentence-transformers/all-mpnet-base-v2')
-    vector_store = FAISS.load_local(
-        folder_path=path, 
-        embeddings=embedding_model, 
-        allow_dangerous_deserialization=True
+def load_pipeline():
+    """
+    Load the embedding model, FAISS vector store and VADER analyzer once per process,
+    behind admission control on the encoder queue. Under prefork.py they were
+    already loaded by the parent and are shared with it.
+    """
+    usafe = preloaded_pipeline()
+    if usafe is None:
+        if env_flag('USAFE_MEMORY_PROFILE'):
+            from memory_profile import log_startup_profile
+            usafe = log_startup_profile()
+        else:
+            usafe = create_pipeline()
+    controller = AdmissionController({
+        'encoder': (env_number('USAFE_ENCODER_HIGH_WATERMARK', 16, int), env_number('USAFE_ENCODER_LOW_WATERMARK', 8, int)),
+    }, log_every=env_number('USAFE_ADMISSION_LOG_SECONDS', 300))
+    return AdmissionControlledPipeline(usafe, controller)
+
+pipeline = load_pipeline()
+
+
+@st.cache_resource
+def load_executor():
+    """Threads that run the slow model stages while the page is already rendering."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix='usafe-model')
+
+executor = load_executor()
+
+# Load the structured resource catalog (organizations, laws and links)
+resource_catalog = load_catalog()
+
+# Response templates, pre-rendered per hate crime category
+prompts = load_prompts()
+
+
+@st.cache_resource
+def load_session_store():
+    """Optional SQLite persistence of conversations (USAFE_SESSION_DB); expired sessions are purged on open."""
+    path = os.getenv('USAFE_SESSION_DB')
+    if not path:
+        return None
+    return SessionStore(
+        path,
+        max_age=env_number('USAFE_SESSION_MAX_AGE_HOURS', 24) * 3600,
+        keep_text=env_flag('USAFE_SESSION_KEEP_TEXT'),
     )
-    return vector_store.as_retriever()
 
-# Load both vector stores
-retriever_combined = load_vector_store('notebooks/vector_databases/usafe_combined')
+session_store = load_session_store()
 
-# Step 3: Set up VADER Sentiment Analysis
-analyzer = SentimentIntensityAnalyzer()
 
-def analyze_sentiment_vader(user_input):
-    """Classify sentiment as either negative or neutral using VADER."""
-    sentiment_scores = analyzer.polarity_scores(user_input)
-    compound_score = sentiment_scores['compound']
-    negative_score = sentiment_scores['neg']
+@st.cache_resource
+def load_trend_recorder():
+    """
+    Optional anonymous trend counters (USAFE_TRENDS_DB): only the category,
+    sentiment bucket, district and time of each classification are counted.
+    """
+    path = os.getenv('USAFE_TRENDS_DB')
+    if not path:
+        return None
+    return TrendRecorder(TrendStore(path), interval=env_number('USAFE_TRENDS_FLUSH_SECONDS', 60))
 
-    # Enhanced classification logic:
-    # - Classify as "negative" if the compound score is below -0.2 or the negative score is above 0.3
-    if compound_score <= -0.2 or negative_score > 0.3:
-        return "negative"
-    else:
-        return "neutral"
+trend_recorder = load_trend_recorder()
 
 # Initialize session state for tracking form submissions
 if 'submitted' not in st.session_state:
     st.session_state['submitted'] = False
+def remember_session(session_id, max_age):
+    """
+    Keep the session id in a first-party cookie of this browser only. It never
+    appears in the URL, so a shared link, the history or a screenshot cannot
+    restore someone's conversation.
+    """
+    components.html(f"""<script>
+        document.cookie = "{SESSION_COOKIE}={session_id}; max-age={int(max_age)}; path=/; SameSite=Strict"
+            + (window.parent.location.protocol === "https:" ? "; Secure" : "");
+    </script>""", height=0)
+
+
+if 'conversation' not in st.session_state:
+    # A reloaded page still has the session cookie; pick the stored conversation back up
+    session_id = st.context.cookies.get(SESSION_COOKIE) if session_store is not None else None
+    stored = session_store.get(session_id) if session_id else None
+    st.session_state['conversation'] = stored or Conversation()
+conversation = st.session_state['conversation']
+if session_store is not None and st.context.cookies.get(SESSION_COOKIE) != conversation.session_id:
+    remember_session(conversation.session_id, session_store.max_age)
 
 # Step 4: Define the user form for input
 with st.form(key="user_form"):
@@ -86,67 +152,58 @@ with st.form(key="user_form"):
         height=85  # Adjust height for better user experience
     )
 
+    if trend_recorder is not None:
+        st.selectbox(
+            "Berlin district (optional, only counted anonymously)",
+            [None] + load_gazetteer().districts,
+            format_func=lambda district: district or "Prefer not to say",
+            key="district",
+        )
+
     submit_button = st.form_submit_button(
         label="⚖️ Submit",  # Add an emoji to make the button more inviting
         help="Click here to submit your information."  # Tooltip for extra guidance
     )
     
     # Display personalized information based on the detected hate crime type
-def display_practical_info(hate_crime_type):
+def display_practical_info(hate_crime_types):
     """
-    Display practical information within an expandable section based on the detected hate crime type.
+    Display practical information within an expandable section based on the detected hate crime types.
+    Resources of every detected type are merged into one list.
     """
     with st.expander("### If you’re unsure where to begin, you can start by exploring topics like..."):
-        if hate_crime_type == "Gender and LGBTQI+ Hate Crime":
-            st.write("### Top 3 Essential Steps")
-            st.markdown("""
-            - **Law**: In Germany, discrimination based on gender identity is illegal. You have rights under the General Equal Treatment Act (AGG).
-            - **Support Organization**: Contact **LesMigraS** for counselling.
-            - **Legal Aid**: Visit **HateAid** for free legal support.
-            """)
-        elif hate_crime_type == "Racist and Xenophobic Hate Crime":
-            st.write("### Top 3 Essential Steps")
-            st.markdown("""
-            - **Law**: In Germany, hate crimes based on race and ethnicity are punishable under the Criminal Code.
-            - **Support Organization**: Reach out to **ReachOut Berlin** for assistance with racism-related incidents.
-            - **Legal Aid**: Contact **VBRG** for support and legal guidance.
-            """)
-        elif hate_crime_type == "Anti-Religious Hate Crime":
-            st.write("### Resources for Anti-Religious Hate Crime")
-            st.markdown("""
-            - **Law**: Anti-religious discrimination is prohibited under the Basic Law for the Federal Republic of Germany.
-            - **Support Organization**: Contact **Berlin Interfaith Council** for community support.
-            - **Legal Aid**: Get in touch with **European Center for Law and Justice** for legal help.
-            """)
+        steps = resource_catalog.merged_essentials(hate_crime_types)
+        if steps:
+            st.write("### Top 3 Essential Steps" if len(hate_crime_types) == 1 else "### Essential Steps")
+            st.markdown("\n".join(f"- **{role}**: {text}" for role, text in steps))
 
 
 # Step 5: Handle form submission
 if submit_button:
     st.session_state['submitted'] = True
+    conversation.add_turn('user', st.session_state['user_input'], stage='description')
 
 # Run the following only if the form is submitted
 if st.session_state.get('submitted'):
 
-    # Step 5.1: Analyze the sentiment of the user's input
-    sentiment = analyze_sentiment_vader(st.session_state['user_input'])
+    user_text = st.session_state['user_input']
+
+    # Step 5.0: Check for signs of immediate danger before any model runs
+    if detect_danger(user_text):
+        st.error("""
+        🚨 **If you are in danger right now, call the police at 110** (ambulance and fire: **112**).  
+        Get to a safe, public place if you can, and stay near other people. You can come back here once you are safe.
+        """)
+
+    # Step 5.1: Start matching the hate crime type in the background, it is the slowest stage
+    classification_future = pipeline.submit_classification(executor, conversation, user_text)
+
+    # Step 5.2: Acknowledge right away; the banner is replaced once the type is known
+    banner = st.empty()
+    banner.info("🤝 Thank you for trusting me with this. I’m looking at what happened to find the right support for you…")
+
+    sentiment = pipeline.sentiment(user_text)
 
-    # Step 5.2: Retrieve relevant documents to identify hate crime type
-    combined_results = retriever_combined.get_relevant_documents(st.session_state['user_input'])
-    
-    hate_crime_type = None
-    if combined_results:
-        hate_crime_source = combined_results[0].metadata.get('source')
-        if hate_crime_source:
-            if "anti_religious_def.pdf" in hate_crime_source:
-                hate_crime_type = "Anti-Religious Hate Crime"
-                st.write("### **Unfortunately, you experienced an Anti-Religious Hate Crime**")
-            elif "racist_def.pdf" in hate_crime_source:
-                hate_crime_type = "Racist and Xenophobic Hate Crime"
-                st.write("### **Unfortunately, you experienced a Racist and Xenophobic Hate Crime**")
-            elif "gender_lgbt_def.pdf" in hate_crime_source:
-                hate_crime_type = "Gender and LGBTQI+ Hate Crime"
-                st.write("### **Unfortunately, you have experienced a Gender and Anti-LGBTQI+ Hate Crime**")
-    
     # Step 5.3: Display the sentiment-based message
     if sentiment == "negative":
         st.write("""
@@ -164,7 +221,38 @@ if st.session_state.get('submitted'):
         """)
         st.info("🔍 Let’s proceed to gather more information and guide you towards the best support available.")
 
+    practical_info = st.empty()
+
+    # Step 5.4: Fill in the hate crime type and practical information when the search completes
+    classification = classification_future.result()
+    if session_store is not None:
+        session_store.save(conversation)
+    # Count each submission once, not on every rerun of the page
+    if trend_recorder is not None and submit_button:
+        trend_recorder.record(
+            classification.category.key if classification.category else None,
+            sentiment,
+            st.session_state.get('district'),
+            conversation.session_id,
+        )
+
+    hate_crime_types = [category.label for category in classification.labels]
+    with banner.container():
+        if len(hate_crime_types) > 1:
+            st.write(f"### **Unfortunately, you experienced a hate crime with more than one motive: {' and '.join(hate_crime_types)}**")
+        elif classification.category:
+            st.write(CATEGORY_HEADLINES[classification.category.key])
+        elif classification.mixed:
+            st.write("### **What happened to you may involve more than one type of hate crime**")
+        else:
+            st.write(prompts.render('fallback'))
+
+    if classification.degraded:
+        st.caption("Many people are reaching out right now, so this is a quick first assessment. "
+                   "The Local Resources and Understanding Rights pages have the full information.")
+
     # Display practical information based on the detected hate crime type
-    if hate_crime_type:
-        display_practical_info(hate_crime_type)
+    if hate_crime_types:
+        with practical_info.container():
+            display_practical_info(hate_crime_types)
     
\ No newline at end of file
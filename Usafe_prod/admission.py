@@ -0,0 +1,171 @@
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+from danger import PatternMatcher
+from pipeline import Classification
+from resource_catalog import load_catalog
+
+# Keyword rules of the plan B prototype (notebooks/plan_b_usafe/usafe_planb.py), per category key
+CATEGORY_KEYWORDS = {
+    'racist': (
+        "racism", "racist", "race", "racial", "xenophob*", "foreigner*", "migrant*", "refugee*", "skin colo*",
+        "black", "roma", "sinti", "asian", "arab*", "turkish", "n-word", "go back to your country",
+        "rassis*", "ausländer*", "flüchtling*", "hautfarbe",
+    ),
+    'gender_lgbt': (
+        "gender", "lgbt*", "sexuality", "gay", "lesbian", "queer", "trans", "transgender", "bisexual",
+        "homophob*", "transphob*", "misogyn*", "sexis*", "woman", "women", "girlfriend", "boyfriend",
+        "schwul*", "lesbe*", "frauenfeind*",
+    ),
+    'anti_religious': (
+        "religion", "religious", "muslim*", "islam*", "jew", "jewish", "antisemit*", "anti-semit*",
+        "christian*", "church", "mosque", "synagogue", "headscarf", "hijab", "kippah", "kippa",
+        "moschee", "kopftuch", "jude*", "jüdisch*",
+    ),
+}
+
+
+class KeywordClassifier:
+    """
+    Rule-based category detection for degraded mode: one automaton pass over
+    the text, then a vote by keyword count. No model is involved.
+    """
+
+    def __init__(self, keywords=CATEGORY_KEYWORDS, catalog=None):
+        self.catalog = catalog or load_catalog()
+        self._category = {}
+        for key, words in keywords.items():
+            for word in words:
+                self._category[word.rstrip('*').lower()] = key
+        self._matcher = PatternMatcher(word for words in keywords.values() for word in words)
+
+    def classify(self, text):
+        """The best-matching Category and all categories with a hit, best first."""
+        counts = {}
+        for phrase, _, _ in self._matcher.finditer(text):
+            key = self._category[phrase]
+            counts[key] = counts.get(key, 0) + 1
+        ranked = sorted(counts, key=counts.get, reverse=True)
+        return [self.catalog.category(key) for key in ranked]
+
+
+class AdmissionController:
+    """
+    Tracks how many requests are queued on or using each expensive resource
+    (the encoder, an LLM). When a queue reaches its high watermark, new
+    requests are shed to the degraded path until it drains below the low
+    watermark again, so the requests already admitted keep their latency.
+
+    Every `log_every` seconds (0 disables it) the counters are printed to
+    stderr, so operators can see when and how often load is being shed.
+    """
+
+    def __init__(self, watermarks, log_every=300):
+        self.watermarks = dict(watermarks)          # resource -> (high, low)
+        self._lock = threading.Lock()
+        self.depth = dict.fromkeys(self.watermarks, 0)
+        self.peak = dict.fromkeys(self.watermarks, 0)
+        self.admitted = dict.fromkeys(self.watermarks, 0)
+        self.shed = dict.fromkeys(self.watermarks, 0)
+        self.overloaded = dict.fromkeys(self.watermarks, False)
+        self.degraded_requests = 0                  # answered by the degraded path
+        self.log_every = log_every
+        self._logged = time.monotonic()
+
+    def acquire(self, resource):
+        """Admit one request to `resource`; False means serve it degraded."""
+        high, low = self.watermarks[resource]
+        with self._lock:
+            depth = self.depth[resource]
+            if depth >= high:
+                self.overloaded[resource] = True
+            elif depth <= low:
+                self.overloaded[resource] = False
+            if self.overloaded[resource]:
+                self.shed[resource] += 1
+                admitted = False
+            else:
+                self.depth[resource] = depth + 1
+                self.peak[resource] = max(self.peak[resource], depth + 1)
+                self.admitted[resource] += 1
+                admitted = True
+            due = self.log_every and time.monotonic() - self._logged >= self.log_every
+            if due:
+                self._logged = time.monotonic()
+        if due:
+            print(self.report(), file=sys.stderr)
+        return admitted
+
+    def release(self, resource):
+        with self._lock:
+            self.depth[resource] -= 1
+
+    def record_degraded(self):
+        with self._lock:
+            self.degraded_requests += 1
+
+    @property
+    def degraded(self):
+        return any(self.overloaded.values())
+
+    def snapshot(self):
+        """Counters per resource, for logs and dashboards."""
+        with self._lock:
+            return {
+                resource: {
+                    'depth': self.depth[resource],
+                    'peak': self.peak[resource],
+                    'admitted': self.admitted[resource],
+                    'shed': self.shed[resource],
+                    'overloaded': self.overloaded[resource],
+                }
+                for resource in self.watermarks
+            }
+
+    def report(self):
+        """One line with the counters of every resource and the requests served degraded."""
+        parts = [
+            f"{resource}: depth {counters['depth']}, peak {counters['peak']}, admitted {counters['admitted']}, "
+            f"shed {counters['shed']}{' (overloaded)' if counters['overloaded'] else ''}"
+            for resource, counters in self.snapshot().items()
+        ]
+        return f"Admission control {'; '.join(parts)}; {self.degraded_requests} requests served degraded"
+
+
+class AdmissionControlledPipeline:
+    """
+    Puts an AdmissionController in front of a pipeline. Classification is
+    submitted to the executor only when the encoder queue has room; otherwise
+    the request is answered immediately by the keyword classifier.
+    """
+
+    def __init__(self, pipeline, controller, keywords=None):
+        self.pipeline = pipeline
+        self.controller = controller
+        self.keywords = keywords or KeywordClassifier()
+
+    @property
+    def degraded_requests(self):
+        return self.controller.degraded_requests
+
+    def degraded_classification(self, text):
+        self.controller.record_degraded()
+        labels = self.keywords.classify(text)
+        return Classification(category=labels[0] if labels else None, labels=labels, degraded=True)
+
+    def submit_classification(self, executor, conversation, text):
+        """A future with the classification of `text`, degraded when the encoder is overloaded."""
+        if not self.controller.acquire('encoder'):
+            future = Future()
+            future.set_result(self.degraded_classification(text))
+            return future
+        future = executor.submit(self.pipeline.classify_turn, conversation, text)
+        future.add_done_callback(lambda _: self.controller.release('encoder'))
+        return future
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.pipeline, name)
@@ -0,0 +1,214 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from functools import lru_cache
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+ASSETS_DIR = os.path.join(ROOT_DIR, 'models', 'usafe_assets')
+MANIFEST = 'manifest.json'
+BUNDLE_VERSION = 1
+
+# Prompt templates shipped with the bundle: name -> LangChain Hub handle or local text file
+PROMPTS = {
+    'retrieval-qa-chat': 'langchain-ai/retrieval-qa-chat',
+    'usafe': os.path.join(ROOT_DIR, 'data', 'usafe_prompt.txt'),
+    'usafe-steps': os.path.join(ROOT_DIR, 'data', 'prompts.json'),
+}
+NLTK_PACKAGES = ('vader_lexicon',)
+
+
+class AssetBundleError(RuntimeError):
+    """Raised when the asset bundle is missing files or fails its integrity check."""
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def model_dir_name(model_name):
+    """Directory name of a Hub model inside the bundle."""
+    return model_name.replace('/', '--')
+
+
+class AssetBundle:
+    """
+    A versioned directory holding everything the app would otherwise download
+    at startup: sentence-transformer weights and tokenizers, the NLTK VADER
+    lexicon and the prompt templates. manifest.json lists every file with its
+    SHA-256, so a bundle is checked once when it is opened and then read
+    straight from local disk.
+    """
+
+    def __init__(self, path, manifest):
+        self.path = path
+        self.manifest = manifest
+        self.version = manifest['version']
+
+    @classmethod
+    def open(cls, path=ASSETS_DIR, verify=True):
+        manifest_path = os.path.join(path, MANIFEST)
+        if not os.path.exists(manifest_path):
+            raise AssetBundleError(f"No asset bundle at {path}")
+        with open(manifest_path, encoding='utf-8') as file:
+            bundle = cls(path, json.load(file))
+        if verify:
+            bundle.verify()
+        bundle.activate()
+        return bundle
+
+    def verify(self):
+        """Check that every listed file exists and matches its hash."""
+        for relative, expected in self.manifest['files'].items():
+            path = os.path.join(self.path, relative)
+            if not os.path.exists(path):
+                raise AssetBundleError(f"Missing bundled file: {relative}")
+            if file_sha256(path) != expected:
+                raise AssetBundleError(f"Integrity check failed for {relative}")
+
+    def activate(self):
+        """
+        Make NLTK resolve its data from the bundle before any other location,
+        and switch the Hugging Face libraries to offline mode, so nothing
+        missing from the bundle is quietly downloaded instead.
+        """
+        import nltk
+        nltk_dir = os.path.join(self.path, 'nltk_data')
+        if nltk_dir not in nltk.data.path:
+            nltk.data.path.insert(0, nltk_dir)
+        os.environ['HF_HUB_OFFLINE'] = '1'
+        os.environ['TRANSFORMERS_OFFLINE'] = '1'
+        # huggingface_hub reads the variable when it is imported; switch a copy imported earlier directly
+        constants = sys.modules.get('huggingface_hub.constants')
+        if constants is not None:
+            constants.HF_HUB_OFFLINE = True
+
+    def model_path(self, model_name):
+        """Local directory of a bundled model; raises AssetBundleError if it is not bundled."""
+        relative = self.manifest['models'].get(model_name)
+        if relative is None:
+            raise AssetBundleError(f"{model_name} is not in the asset bundle at {self.path}; rebuild the bundle "
+                                   f"with it included (see `python Usafe_prod/assets.py --help`)")
+        path = os.path.join(self.path, relative)
+        if not os.path.isdir(path):
+            raise AssetBundleError(f"Missing bundled model directory: {relative}")
+        return path
+
+    def prompt(self, name):
+        """Load a bundled prompt: a LangChain prompt object, or plain text."""
+        entry = self.manifest['prompts'].get(name)
+        if entry is None:
+            raise AssetBundleError(f"Prompt {name!r} is not in the asset bundle at {self.path}")
+        path = os.path.join(self.path, entry['file'])
+        with open(path, encoding='utf-8') as file:
+            if entry['format'] == 'langchain':
+                from langchain_core.load import load
+                return load(json.load(file))
+            return file.read()
+
+
+@lru_cache(maxsize=None)
+def load_bundle(path=None):
+    """
+    Open the bundle at USAFE_ASSETS (default models/usafe_assets) once per process.
+    Returns None when no bundle is installed, so models are fetched as before;
+    once a bundle is open the process runs offline.
+    """
+    path = path or os.getenv('USAFE_ASSETS') or ASSETS_DIR
+    if not os.path.exists(os.path.join(path, MANIFEST)):
+        if os.getenv('USAFE_ASSETS'):
+            raise AssetBundleError(f"USAFE_ASSETS points to {path}, which has no {MANIFEST}")
+        return None
+    verify = os.getenv('USAFE_ASSETS_VERIFY', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+    return AssetBundle.open(path, verify=verify)
+
+
+def resolve_model(model_name):
+    """
+    The bundled copy of a model when a bundle is installed (AssetBundleError if
+    the bundle lacks it), otherwise its Hub name.
+    """
+    bundle = load_bundle()
+    return bundle.model_path(model_name) if bundle else model_name
+
+
+def build_bundle(output_dir=ASSETS_DIR, models=(), prompts=PROMPTS, nltk_packages=NLTK_PACKAGES):
+    """
+    Download every asset into a fresh bundle and write its manifest.
+    This is the only step that needs network access.
+    """
+    from huggingface_hub import snapshot_download
+    import nltk
+
+    staging = f"{output_dir}.tmp"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    manifest = {'version': BUNDLE_VERSION, 'models': {}, 'prompts': {}, 'files': {}}
+
+    for model_name in models:
+        relative = os.path.join('models', model_dir_name(model_name))
+        snapshot_download(
+            model_name,
+            local_dir=os.path.join(staging, relative),
+            ignore_patterns=['*.h5', '*.ot', '*.msgpack', 'onnx/*', 'openvino/*', '*.onnx'],
+        )
+        shutil.rmtree(os.path.join(staging, relative, '.cache'), ignore_errors=True)
+        manifest['models'][model_name] = relative
+
+    for package in nltk_packages:
+        if not nltk.download(package, download_dir=os.path.join(staging, 'nltk_data'), quiet=True):
+            raise AssetBundleError(f"Could not download NLTK package {package}")
+
+    os.makedirs(os.path.join(staging, 'prompts'))
+    for name, source in prompts.items():
+        if os.path.exists(source):
+            relative = os.path.join('prompts', name + os.path.splitext(source)[1])
+            shutil.copyfile(source, os.path.join(staging, relative))
+            manifest['prompts'][name] = {'file': relative, 'format': 'text'}
+        else:
+            from langchain import hub
+            from langchain_core.load import dumpd
+            relative = os.path.join('prompts', f"{name}.json")
+            with open(os.path.join(staging, relative), 'w', encoding='utf-8') as file:
+                json.dump(dumpd(hub.pull(source)), file, indent=2)
+            manifest['prompts'][name] = {'file': relative, 'format': 'langchain', 'source': source}
+
+    for directory, _, files in os.walk(staging):
+        for name in sorted(files):
+            path = os.path.join(directory, name)
+            manifest['files'][os.path.relpath(path, staging)] = file_sha256(path)
+    with open(os.path.join(staging, MANIFEST), 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.rename(staging, output_dir)
+    return manifest
+
+
+if __name__ == "__main__":
+    from pipeline import EMBEDDING_MODEL, MULTILINGUAL_EMBEDDING_MODEL
+    from reranker import RERANK_MODEL
+
+    parser = argparse.ArgumentParser(description="Download the models, NLTK data and prompts into a local bundle.")
+    parser.add_argument('--output', default=ASSETS_DIR)
+    parser.add_argument('--model', action='append', dest='models',
+                        help="Hub model to bundle (repeatable; defaults to the encoder and re-ranker)")
+    parser.add_argument('--multilingual', action='store_true', help="Also bundle the multilingual encoder")
+    parser.add_argument('--verify', action='store_true', help="Only check an existing bundle")
+    args = parser.parse_args()
+
+    if args.verify:
+        bundle = AssetBundle.open(args.output)
+        print(f"Bundle v{bundle.version} OK: {len(bundle.manifest['files'])} files")
+    else:
+        models = args.models or [EMBEDDING_MODEL, RERANK_MODEL]
+        if args.multilingual:
+            models.append(MULTILINGUAL_EMBEDDING_MODEL)
+        manifest = build_bundle(args.output, models)
+        print(f"Bundle v{manifest['version']} written to {args.output}: {len(manifest['files'])} files")
@@ -0,0 +1,166 @@
+import math
+import re
+from dataclasses import dataclass, field
+
+from langchain.docstore.document import Document
+
+# Numbered legal provisions: "§ 130", "§§ 185", "Section 46(2)", "Article 3", "Art. 4"
+LEGAL_SECTION = re.compile(r'^(§§?\s*\d+[a-z]?|Section\s+\d+[a-z]?\b|Article\s+\d+\b|Art\.\s*\d+)', re.IGNORECASE)
+# Outline numbering: "1.", "2.3", "4.1.2 Title"
+NUMBERED_HEADING = re.compile(r'^\d+(\.\d+)*\.?\s+\S')
+# Sentence ends followed by the start of a new sentence
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])["”’)]?\s+(?=["„“(§\[]?[A-Z0-9§])')
+ABBREVIATIONS = ('e.g.', 'i.e.', 'etc.', 'cf.', 'para.', 'No.', 'no.', 'Art.', 'Sec.', 'vs.', 'Dr.', 'Mr.', 'Ms.', 'St.')
+
+MAX_HEADING_LENGTH = 90
+
+
+@dataclass
+class Section:
+    heading: str = None
+    lines: list = field(default_factory=list)
+
+    @property
+    def text(self):
+        return _join_lines(self.lines)
+
+
+def _join_lines(lines):
+    """Join wrapped PDF lines, undoing end-of-line hyphenation."""
+    text = ''
+    for line in lines:
+        if text.endswith('-') and line[:1].islower():
+            text = text[:-1] + line
+        elif text:
+            text = f"{text} {line}"
+        else:
+            text = line
+    return text
+
+
+def is_heading(line):
+    """Heuristically decide whether a line of extracted PDF text is a heading."""
+    if not line or len(line) > MAX_HEADING_LENGTH:
+        return False
+    if LEGAL_SECTION.match(line):
+        return True
+    if line[-1] in '.,;:' or not line[0].isupper() and not line[0].isdigit() and line[0] != '§':
+        return False
+    if NUMBERED_HEADING.match(line):
+        return True
+    words = re.findall(r"[^\W\d_]+", line)
+    if not words:
+        return False
+    if line.isupper():
+        return True
+    capitalized = sum(1 for word in words if word[0].isupper() or len(word) <= 3)
+    return len(words) <= 8 and capitalized / len(words) >= 0.75
+
+
+def split_sections(text):
+    """Split extracted text into sections at detected headings."""
+    sections = [Section()]
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        if is_heading(line):
+            sections.append(Section(heading=line))
+        else:
+            sections[-1].lines.append(line)
+    return [section for section in sections if section.lines or section.heading]
+
+
+def split_sentences(text):
+    """Split text at sentence boundaries, keeping common abbreviations intact."""
+    sentences = []
+    for piece in SENTENCE_BOUNDARY.split(text):
+        if sentences and sentences[-1].endswith(ABBREVIATIONS):
+            sentences[-1] = f"{sentences[-1]} {piece}"
+        else:
+            sentences.append(piece)
+    return [sentence.strip() for sentence in sentences if sentence.strip()]
+
+
+def _pack(sentences, target, limit):
+    """Greedily pack sentences into chunks of about `target` characters, never above `limit`."""
+    chunks, current = [], ''
+    for sentence in sentences:
+        while len(sentence) > limit:
+            # A single run-on "sentence" longer than the limit is cut at a word boundary
+            cut = sentence.rfind(' ', 0, limit)
+            cut = cut if cut > 0 else limit
+            if current:
+                chunks.append(current)
+                current = ''
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        candidate = f"{current} {sentence}".strip()
+        if current and (len(candidate) > limit or len(current) >= target):
+            chunks.append(current)
+            current = sentence
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_text(text, max_chars=1000, min_chars=200):
+    """
+    Split text into chunks that follow its structure: one chunk per section
+    when it fits, otherwise sentence-aligned pieces of even size. Sections
+    shorter than `min_chars` are merged into the next one. Chunks never overlap.
+
+    Returns a list of (heading, text) pairs.
+    """
+    chunks = []
+    carry_heading, carry_text = None, ''
+    for section in split_sections(text):
+        body = section.text
+        if section.heading:
+            body = f"{section.heading}\n{body}".strip()
+        if carry_text:
+            body = f"{carry_text}\n{body}"
+            heading = carry_heading or section.heading
+        else:
+            heading = section.heading
+        if len(body) < min_chars:
+            carry_heading, carry_text = heading, body
+            continue
+        carry_heading, carry_text = None, ''
+
+        if len(body) <= max_chars:
+            chunks.append((heading, body))
+            continue
+        # Adaptive size: spread the section evenly instead of leaving a short tail,
+        # leaving room for the heading repeated at the top of each piece
+        limit = max_chars - (len(heading) + 1 if heading else 0)
+        pieces = math.ceil(len(body) / limit)
+        target = math.ceil(len(body) / pieces)
+        for position, piece in enumerate(_pack(split_sentences(body), target, limit)):
+            if position and heading and not piece.startswith(heading):
+                piece = f"{heading}\n{piece}"
+            chunks.append((heading, piece))
+    if carry_text:
+        if chunks and len(chunks[-1][1]) + len(carry_text) <= max_chars:
+            heading, previous = chunks.pop()
+            chunks.append((heading, f"{previous}\n{carry_text}"))
+        else:
+            chunks.append((carry_heading, carry_text))
+    return chunks
+
+
+def chunk_documents(documents, max_chars=1000, min_chars=200):
+    """
+    Structure-aware replacement for RecursiveCharacterTextSplitter.split_documents.
+    Each chunk keeps its document's metadata plus its section heading and position.
+    """
+    chunks = []
+    for document in documents:
+        for position, (heading, text) in enumerate(chunk_text(document.page_content, max_chars, min_chars)):
+            metadata = dict(document.metadata, chunk=position)
+            if heading:
+                metadata['section'] = heading
+            chunks.append(Document(page_content=text, metadata=metadata))
+    return chunks
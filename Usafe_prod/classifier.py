@@ -0,0 +1,242 @@
+import json
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+
+# Written next to index.faiss by index_builder.py --calibrate
+CALIBRATION_FILE = 'calibration.json'
+
+DEFAULT_TEMPERATURE = 0.05
+DEFAULT_K = 10
+
+
+def load_calibration(index_path):
+    """Return the calibration saved with an index, or an empty dict."""
+    path = os.path.join(index_path, CALIBRATION_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_calibration(index_path, **values):
+    """Merge values into the calibration file of an index."""
+    calibration = load_calibration(index_path)
+    calibration.update(values)
+    with open(os.path.join(index_path, CALIBRATION_FILE), 'w', encoding='utf-8') as file:
+        json.dump(calibration, file, indent=2)
+    return calibration
+
+
+def row_categories(vector_store, catalog, keys):
+    """
+    Map every FAISS row to the position of its source's category in `keys`,
+    or len(keys) for chunks outside the catalog's categories.
+    """
+    categories = np.full(vector_store.index.ntotal, len(keys), dtype=np.int64)
+    for row, doc_id in vector_store.index_to_docstore_id.items():
+        document = vector_store.docstore.search(doc_id)
+        category = catalog.category(getattr(document, 'metadata', {}).get('source'))
+        if category is not None:
+            categories[row] = keys.index(category.key)
+    return categories
+
+
+def normalize(vectors):
+    """Scale rows to unit length, leaving zero rows as they are."""
+    vectors = np.asarray(vectors, dtype='float32')
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def category_centroids(vector_store, catalog, keys):
+    """One unit vector per category: the normalized mean of its chunks' vectors."""
+    index = vector_store.index
+    vectors = index.reconstruct_n(0, index.ntotal)
+    owners = row_categories(vector_store, catalog, keys)
+    centroids = np.zeros((len(keys), index.d), dtype='float32')
+    for position in range(len(keys)):
+        members = vectors[owners == position]
+        if len(members):
+            centroids[position] = members.mean(axis=0)
+    return normalize(centroids)
+
+
+@dataclass
+class Vote:
+    probabilities: dict = field(default_factory=dict)   # category key -> probability
+    category: str = None                                # winning key, None if unclear
+    mixed: bool = False
+
+    @property
+    def confidence(self):
+        return max(self.probabilities.values(), default=0.0)
+
+
+class CategoryVoter:
+    """
+    Classifies by distance-weighted votes over the top-k chunks instead of the
+    first hit alone. Every FAISS row is mapped to its category once at load
+    time, so a search result is turned into per-category probabilities with a
+    few array operations and no docstore lookups.
+    """
+
+    def __init__(self, vector_store, catalog, temperature=DEFAULT_TEMPERATURE, k=DEFAULT_K,
+                 min_probability=0.5, min_margin=0.15):
+        self.vector_store = vector_store
+        self.index = vector_store.index
+        self.keys = [category.key for category in catalog.categories]
+        self.temperature = temperature
+        self.k = k
+        self.min_probability = min_probability
+        self.min_margin = min_margin
+
+        # Rows from documents outside the catalog's categories vote for an extra "other" column
+        self.row_category = row_categories(vector_store, catalog, self.keys)
+
+    def search(self, vectors, k=None):
+        """Return (squared L2 distances, rows) for a batch of query vectors."""
+        vectors = np.asarray(vectors, dtype='float32').reshape(-1, self.index.d)
+        return self.index.search(vectors, k or self.k)
+
+    def probabilities(self, distances, rows, temperature=None):
+        """
+        Aggregate softmax(-distance / temperature) weights per category.
+        Returns an (n, categories + 1) array whose last column is "other".
+        """
+        temperature = temperature or self.temperature
+        n, k = rows.shape
+        columns = len(self.keys) + 1
+        valid = rows >= 0
+        # Subtract the per-row minimum distance for numerical stability
+        masked = np.where(valid, distances, np.inf)
+        shifted = np.where(valid, masked - masked.min(axis=1, keepdims=True), 0.0)
+        weights = np.where(valid, np.exp(-shifted / temperature), 0.0)
+        categories = self.row_category[np.where(valid, rows, 0)]
+        flat = (categories + columns * np.arange(n)[:, None]).ravel()
+        scores = np.bincount(flat, weights=weights.ravel(), minlength=n * columns).reshape(n, columns)
+        totals = scores.sum(axis=1, keepdims=True)
+        return np.divide(scores, totals, out=np.zeros_like(scores), where=totals > 0)
+
+    def decide(self, probabilities):
+        """Turn one row of probabilities into a Vote, flagging close or weak outcomes as mixed."""
+        known = probabilities[:len(self.keys)]
+        order = np.argsort(known)[::-1]
+        best = known[order[0]] if len(order) else 0.0
+        runner_up = known[order[1]] if len(order) > 1 else 0.0
+        vote = Vote(probabilities={key: float(p) for key, p in zip(self.keys, known)})
+        if best >= self.min_probability and best - runner_up >= self.min_margin:
+            vote.category = self.keys[order[0]]
+        else:
+            vote.mixed = best > 0
+        return vote
+
+    def classify_vectors(self, vectors):
+        """Classify a batch of query vectors in one search and one vectorized vote."""
+        distances, rows = self.search(vectors)
+        return [self.decide(row) for row in self.probabilities(distances, rows)]
+
+    def classify(self, text):
+        vector = self.vector_store.embedding_function.embed_query(text)
+        return self.classify_vectors([vector])[0]
+
+    def calibrate_temperature(self, vectors, labels, candidates=None):
+        """
+        Pick the temperature that minimizes the negative log-likelihood of the
+        labelled queries (each label is a tuple of acceptable category keys).
+        """
+        candidates = candidates if candidates is not None else np.geomspace(0.005, 1.0, 25)
+        distances, rows = self.search(vectors)
+        targets = np.zeros((len(labels), len(self.keys) + 1))
+        for i, label in enumerate(labels):
+            for key in label:
+                if key in self.keys:
+                    targets[i, self.keys.index(key)] = 1.0
+        best, best_loss = self.temperature, np.inf
+        for temperature in candidates:
+            probabilities = self.probabilities(distances, rows, temperature)
+            likelihood = (probabilities * targets).sum(axis=1)
+            loss = -np.log(np.clip(likelihood, 1e-9, 1.0)).mean()
+            if loss < best_loss:
+                best, best_loss = float(temperature), loss
+        self.temperature = best
+        return best
+
+
+class MultiLabelClassifier:
+    """
+    Scores a query against one precomputed vector per category (the normalized
+    centroid of its chunks) in a single matrix product, and returns every
+    category whose similarity clears its threshold, so intersectional incidents
+    get all their labels.
+
+    Per-category thresholds come from calibration; without them, categories
+    within `margin` of the best score are included.
+    """
+
+    def __init__(self, vector_store, catalog, thresholds=None, margin=0.03, floor=0.0):
+        self.vector_store = vector_store
+        self.keys = [category.key for category in catalog.categories]
+        self.thresholds = thresholds or {}
+        self.margin = margin
+        self.floor = floor
+
+        self.category_vectors = category_centroids(vector_store, catalog, self.keys)
+
+    def scores(self, vectors):
+        """Cosine similarity of each query vector to each category, shape (n, categories)."""
+        vectors = np.asarray(vectors, dtype='float32').reshape(-1, self.category_vectors.shape[1])
+        return normalize(vectors) @ self.category_vectors.T
+
+    def labels(self, row):
+        """Category keys for one row of scores, best first."""
+        order = np.argsort(row)[::-1]
+        best = row[order[0]]
+        selected = []
+        for position in order:
+            key, score = self.keys[position], row[position]
+            if score < self.floor:
+                continue
+            threshold = self.thresholds.get(key)
+            if threshold is not None and score >= threshold:
+                selected.append(key)
+            elif threshold is None and score >= best - self.margin:
+                selected.append(key)
+        # The best category always counts when it clears the floor
+        if not selected and best >= self.floor:
+            selected.append(self.keys[order[0]])
+        return selected
+
+    def classify_vectors(self, vectors):
+        """Return (labels, scores) per query vector."""
+        scores = self.scores(vectors)
+        return [(self.labels(row), dict(zip(self.keys, map(float, row)))) for row in scores]
+
+    def classify(self, text):
+        vector = self.vector_store.embedding_function.embed_query(text)
+        return self.classify_vectors([vector])[0]
+
+    def calibrate_thresholds(self, vectors, labels):
+        """
+        Choose, for each category, the score threshold that maximizes F1 on
+        labelled queries (each label is a tuple of category keys).
+        """
+        scores = self.scores(vectors)
+        thresholds = {}
+        for position, key in enumerate(self.keys):
+            truth = np.array([key in label for label in labels])
+            column = scores[:, position]
+            best_threshold, best_f1 = None, -1.0
+            for threshold in np.unique(np.floor(column * 1000) / 1000):
+                predicted = column >= threshold
+                true_positive = np.sum(predicted & truth)
+                precision = true_positive / max(predicted.sum(), 1)
+                recall = true_positive / max(truth.sum(), 1)
+                f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+                if f1 > best_f1:
+                    best_threshold, best_f1 = float(threshold), f1
+            if best_threshold is not None:
+                thresholds[key] = best_threshold
+        self.thresholds = thresholds
+        return thresholds
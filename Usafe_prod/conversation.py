@@ -0,0 +1,199 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from dataclasses import dataclass, field, replace
+
+# Stages of the multi-turn flow designed in notebooks/Prompt_test.ipynb
+STAGES = ('initial', 'fallback', 'description', 'report', 'rights', 'resources', 'other')
+
+TOKEN = re.compile(r"\w+|[^\w\s]")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def count_tokens(text):
+    """Rough token count (words and punctuation); close enough for window budgeting."""
+    return len(TOKEN.findall(text))
+
+
+def first_sentence(text, max_chars=200):
+    sentence = SENTENCE_END.split(text.strip(), maxsplit=1)[0]
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars - 1] + "…"
+
+
+@dataclass
+class Turn:
+    role: str       # 'user' or 'assistant'
+    text: str
+    stage: str = None
+    tokens: int = 0
+
+    def __post_init__(self):
+        if not self.tokens:
+            self.tokens = count_tokens(self.text)
+
+
+@dataclass
+class Conversation:
+    """
+    Per-session state: the recent turns within a token budget, a rolling summary
+    of the turns that fell out of it, the detected categories, the retrieved
+    chunk ids and the current stage.
+
+    Memory per session is bounded by `max_tokens` for the window and
+    `max_summary_chars` for the summary; chunk ids are kept so follow-up
+    questions reuse the first retrieval instead of searching again.
+    """
+    session_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    stage: str = 'initial'
+    categories: list = field(default_factory=list)      # category keys, best first
+    mixed: bool = False
+    chunk_ids: list = field(default_factory=list)       # docstore ids of the retrieved chunks
+    query: str = None                                    # text the chunks were retrieved for
+    summary: str = ''
+    turns: deque = field(default_factory=deque)
+    window_tokens: int = 0
+    max_tokens: int = 1024
+    max_summary_chars: int = 600
+    updated: float = field(default_factory=time.time)
+
+    @property
+    def category(self):
+        return self.categories[0] if self.categories else None
+
+    def add_turn(self, role, text, stage=None):
+        """Append a turn and move the oldest turns into the summary while over budget."""
+        if stage is not None:
+            self.stage = stage
+        turn = Turn(role, text, self.stage)
+        self.turns.append(turn)
+        self.window_tokens += turn.tokens
+        while self.window_tokens > self.max_tokens and len(self.turns) > 1:
+            self._summarize(self.turns.popleft())
+        self.updated = time.time()
+        return turn
+
+    def _summarize(self, turn):
+        self.window_tokens -= turn.tokens
+        # Only what the user said is worth keeping; assistant turns are re-rendered from templates
+        if turn.role != 'user':
+            return
+        summary = f"{self.summary} {first_sentence(turn.text)}".strip()
+        if len(summary) > self.max_summary_chars:
+            summary = "…" + summary[-(self.max_summary_chars - 1):]
+        self.summary = summary
+
+    def remember(self, query, categories, chunk_ids, mixed=False):
+        """Store the outcome of classifying `query`."""
+        self.query = query
+        self.categories = list(categories)
+        self.mixed = mixed
+        self.chunk_ids = list(chunk_ids)
+        self.updated = time.time()
+
+    def without_text(self):
+        """
+        Copy that keeps nothing the user wrote: no turns, summary or retrieval
+        query, only the stage, categories and chunk ids.
+        """
+        return replace(self, turns=deque(), window_tokens=0, summary='', query=None)
+
+    def to_bytes(self):
+        """Compact serialized form: short-keyed JSON, zlib-compressed."""
+        state = {
+            'i': self.session_id,
+            's': self.stage,
+            'c': self.categories,
+            'x': int(self.mixed),
+            'k': self.chunk_ids,
+            'q': self.query,
+            'm': self.summary,
+            't': [[turn.role[0], turn.text, turn.stage, turn.tokens] for turn in self.turns],
+            'b': [self.max_tokens, self.max_summary_chars],
+            'u': round(self.updated, 3),
+        }
+        return zlib.compress(json.dumps(state, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+
+    @classmethod
+    def from_bytes(cls, data):
+        state = json.loads(zlib.decompress(data).decode('utf-8'))
+        roles = {'u': 'user', 'a': 'assistant'}
+        turns = deque(Turn(roles[role], text, stage, tokens) for role, text, stage, tokens in state['t'])
+        max_tokens, max_summary_chars = state['b']
+        return cls(
+            session_id=state['i'],
+            stage=state['s'],
+            categories=state['c'],
+            mixed=bool(state['x']),
+            chunk_ids=state['k'],
+            query=state['q'],
+            summary=state['m'],
+            turns=turns,
+            window_tokens=sum(turn.tokens for turn in turns),
+            max_tokens=max_tokens,
+            max_summary_chars=max_summary_chars,
+            updated=state['u'],
+        )
+
+
+class SessionStore:
+    """
+    Conversations persisted in a local SQLite file, one compressed row per
+    session. Safe to share between Streamlit script threads.
+
+    Unless `keep_text` is set only the stage, categories and chunk ids are
+    written, never anything the user typed. Sessions idle for longer
+    than `max_age` are deleted when the store opens and then every
+    `expire_interval` seconds from a background thread.
+    """
+
+    def __init__(self, path, max_age=24 * 3600, keep_text=False, expire_interval=3600):
+        self.max_age = max_age
+        self.keep_text = keep_text
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, updated REAL, state BLOB)"
+            )
+        self.expire()
+        self._stop = threading.Event()
+        if expire_interval:
+            threading.Thread(target=self._run, args=(expire_interval,), name='session-expiry', daemon=True).start()
+
+    def get(self, session_id):
+        """Return the stored conversation, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT state FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        return Conversation.from_bytes(row[0]) if row else None
+
+    def save(self, conversation):
+        stored = conversation if self.keep_text else conversation.without_text()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (id, updated, state) VALUES (?, ?, ?)",
+                (conversation.session_id, conversation.updated, stored.to_bytes()),
+            )
+
+    def expire(self, now=None):
+        """Delete sessions idle for longer than max_age; returns how many were removed."""
+        cutoff = (now or time.time()) - self.max_age
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM sessions WHERE updated < ?", (cutoff,)).rowcount
+
+    def _run(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.expire()
+            except sqlite3.Error as exc:
+                print(f"Session expiry failed: {exc}")
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            self._db.close()
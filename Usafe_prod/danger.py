@@ -0,0 +1,97 @@
+import json
+import os
+from collections import deque
+from functools import lru_cache
+
+from resource_catalog import DATA_DIR
+
+DANGER_TERMS_PATH = os.path.join(DATA_DIR, 'danger_terms.json')
+PREFIX = '*'
+
+
+class PatternMatcher:
+    """
+    Aho-Corasick automaton over a fixed set of phrases: one pass over the
+    text finds every occurrence of every phrase, however many there are.
+
+    Matches must start at a word boundary and end at one, unless the phrase
+    was given with a trailing '*', which also matches longer words.
+    """
+
+    def __init__(self, phrases):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+        self._prefix = set()
+        for phrase in phrases:
+            prefix = phrase.endswith(PREFIX)
+            phrase = phrase.rstrip(PREFIX).lower()
+            if prefix:
+                self._prefix.add(phrase)
+            self._add(phrase)
+        self._link()
+
+    def _add(self, phrase):
+        state = 0
+        for char in phrase:
+            following = self._goto[state].get(char)
+            if following is None:
+                following = len(self._goto)
+                self._goto[state][char] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            state = following
+        self._output[state] += (phrase,)
+
+    def _link(self):
+        """Breadth-first failure links, with outputs merged along them."""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self._goto[state].items():
+                queue.append(following)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[following] = target if target != following else 0
+                self._output[following] += self._output[self._fail[following]]
+
+    def finditer(self, text):
+        """Yield (phrase, start, end) for every match in `text`."""
+        text = text.lower()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for phrase in output[state]:
+                start, end = position + 1 - len(phrase), position + 1
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if end < len(text) and text[end].isalnum() and phrase not in self._prefix:
+                    continue
+                yield phrase, start, end
+
+    def findall(self, text):
+        """The distinct phrases found in `text`, in order of appearance."""
+        found = []
+        for phrase, _, _ in self.finditer(text):
+            if phrase not in found:
+                found.append(phrase)
+        return found
+
+
+@lru_cache(maxsize=None)
+def load_danger_matcher(path=DANGER_TERMS_PATH):
+    """Compile the English and German danger lexicon once per process."""
+    with open(path, encoding='utf-8') as file:
+        lexicon = json.load(file)
+    return PatternMatcher(term for terms in lexicon['terms'].values() for term in terms)
+
+
+def detect_danger(text):
+    """Danger phrases in a submission; empty when there is no sign of immediate danger."""
+    return load_danger_matcher().findall(text)
@@ -0,0 +1,147 @@
+import argparse
+import hashlib
+import re
+from collections import defaultdict
+from dataclasses import replace
+
+import numpy as np
+
+MERSENNE_PRIME = (1 << 31) - 1
+WORD = re.compile(r"\w+")
+
+
+def shingles(text, size=3):
+    """Word n-grams of a text; short texts fall back to their words."""
+    words = WORD.findall(text.lower())
+    if len(words) < size:
+        return set(words)
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def shingle_hashes(text, size=3):
+    values = [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little')
+              for s in shingles(text, size)]
+    return np.array(values or [0], dtype=np.uint64) % MERSENNE_PRIME
+
+
+class MinHasher:
+    """MinHash signatures from `num_perm` universal hash functions (a*x + b) mod p."""
+
+    def __init__(self, num_perm=128, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    def signature(self, text):
+        hashes = shingle_hashes(text)
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) % MERSENNE_PRIME).min(axis=1)
+
+    def signatures(self, texts):
+        return np.stack([self.signature(text) for text in texts]) if texts else np.zeros((0, self.num_perm))
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def near_duplicate_clusters(texts, keys=None, threshold=0.7, num_perm=128, bands=16):
+    """
+    Group texts whose estimated Jaccard similarity reaches `threshold`.
+
+    Signatures are split into `bands` bands; texts sharing a band bucket become
+    candidates, so the work grows with the number of texts rather than with
+    the number of pairs. Within a bucket each text is confirmed on its full
+    signature against one representative of every cluster found so far, and
+    pairs already joined through union-find are skipped, so a bucket holding
+    two separate clusters is still split correctly.
+    When `keys` are given, only texts with the same key are grouped.
+    Returns clusters as lists of indices in input order.
+    """
+    rows = num_perm // bands
+    signatures = MinHasher(num_perm).signatures(texts)
+    keys = keys if keys is not None else [None] * len(texts)
+    parent = list(range(len(texts)))
+
+    for band in range(bands):
+        buckets = defaultdict(list)
+        chunk = signatures[:, band * rows:(band + 1) * rows]
+        for i, row in enumerate(chunk):
+            buckets[keys[i], row.tobytes()].append(i)
+        for members in buckets.values():
+            # One representative per cluster found in the bucket: a popular bucket (boilerplate
+            # openings) is mostly one cluster, so this stays linear instead of comparing all pairs
+            representatives = []
+            for member in members:
+                root = _find(parent, member)
+                for representative in representatives:
+                    root_representative = _find(parent, representative)
+                    if root_representative == root:
+                        break
+                    if np.mean(signatures[representative] == signatures[member]) >= threshold:
+                        parent[max(root, root_representative)] = min(root, root_representative)
+                        break
+                else:
+                    representatives.append(member)
+
+    clusters = defaultdict(list)
+    for i in range(len(texts)):
+        clusters[_find(parent, i)].append(i)
+    return sorted(clusters.values(), key=lambda members: members[0])
+
+
+def deduplicate(records, threshold=0.7, num_perm=128, bands=16):
+    """
+    Keep the first record of each cluster of near-identical descriptions with
+    the same bias motivation; its `count` becomes the number of records the
+    cluster stands for.
+    """
+    records = list(records)
+    clusters = near_duplicate_clusters(
+        [record.description for record in records],
+        keys=[record.motivation for record in records],
+        threshold=threshold, num_perm=num_perm, bands=bands,
+    )
+    return [replace(records[members[0]], count=sum(records[i].count for i in members)) for members in clusters]
+
+
+def shrink_report(records, kept):
+    """
+    What dedup actually saves: the benchmark and calibration queries that are
+    embedded (one encoder call per description) and the size of the
+    descriptions file. The FAISS index is built from the PDFs and does not change.
+    """
+    def size(texts):
+        return sum(len(text.encode('utf-8')) for text in texts)
+
+    return {
+        'records': len(records),
+        'kept': len(kept),
+        'clusters_with_duplicates': sum(record.count > 1 for record in kept),
+        'bytes_before': size(record.description for record in records),
+        'bytes_after': size(record.description for record in kept),
+        'reduction': 1 - len(kept) / len(records) if records else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    from descriptions import DESCRIPTIONS_GERMANY, iter_descriptions
+
+    parser = argparse.ArgumentParser(description="Report near-duplicate incident descriptions.")
+    parser.add_argument('path', nargs='?', default=DESCRIPTIONS_GERMANY)
+    parser.add_argument('--threshold', type=float, default=0.7, help="Estimated Jaccard similarity of duplicates")
+    parser.add_argument('--show', type=int, default=5, help="Largest clusters to print")
+    args = parser.parse_args()
+
+    records = list(iter_descriptions(args.path))
+    kept = deduplicate(records, args.threshold)
+    report = shrink_report(records, kept)
+    print(f"{report['records']} records -> {report['kept']} kept "
+          f"({report['clusters_with_duplicates']} clusters had duplicates)")
+    print(f"{report['reduction']:.1%} fewer benchmark and calibration queries to embed; "
+          f"descriptions {report['bytes_before'] / 1024:.0f} KB -> {report['bytes_after'] / 1024:.0f} KB")
+    for record in sorted(kept, key=lambda record: record.count, reverse=True)[:args.show]:
+        print(f"{record.count:5d}  {record.description[:100]}")
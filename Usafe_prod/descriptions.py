@@ -0,0 +1,142 @@
+import argparse
+import gzip
+import os
+from collections import Counter
+from dataclasses import dataclass
+
+from dedup import deduplicate
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+DESCRIPTIONS_GERMANY = os.path.join(DATA_DIR, 'categorized_descriptions_germany.txt')
+
+MOTIVATION_HEADER = 'Bias Motivations:'
+DESCRIPTION_HEADER = 'Description:'
+ITEM_PREFIX = '- '
+COUNT_HEADER = 'Count:'
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Bias motivations from the incident dataset mapped to the app's category keys
+# (data/resources.json). Motivations without a category (e.g. disability) map to None.
+MOTIVATION_CATEGORIES = {
+    'Anti-Christian hate crime': 'anti_religious',
+    'Anti-Muslim hate crime': 'anti_religious',
+    'Anti-Semitic hate crime': 'anti_religious',
+    'Other hate crime based on religion or belief': 'anti_religious',
+    'Racist and xenophobic hate crime': 'racist',
+    'Anti-Roma hate crime': 'racist',
+    'Anti-LGBTI hate crime': 'gender_lgbt',
+    'Gender-based hate crime': 'gender_lgbt',
+    'Disability hate crime': None,
+}
+
+
+@dataclass(frozen=True)
+class IncidentDescription:
+    motivation: str
+    description: str
+    count: int = 1      # incidents this description stands for after deduplication
+
+    @property
+    def motivations(self):
+        """The individual bias motivations of an intersectional incident."""
+        return tuple(part.strip() for part in self.motivation.split(', '))
+
+    @property
+    def categories(self):
+        """App category keys for this incident, without duplicates, in motivation order."""
+        categories = []
+        for motivation in self.motivations:
+            category = MOTIVATION_CATEGORIES.get(motivation)
+            if category and category not in categories:
+                categories.append(category)
+        return tuple(categories)
+
+
+def open_text(path):
+    """
+    Open a plain or gzip-compressed text file for line-by-line reading.
+    Compression is detected from the file's magic bytes, not its name.
+    """
+    with open(path, 'rb') as file:
+        magic = file.read(len(GZIP_MAGIC))
+    if magic == GZIP_MAGIC:
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, encoding='utf-8', errors='replace')
+
+
+def iter_descriptions(source=DESCRIPTIONS_GERMANY):
+    """
+    Stream (motivation, description) records from a categorized descriptions file.
+
+    `source` is a path (plain or gzip) or any iterable of lines. Only the current
+    record is held in memory, so input size is not limited by RAM. Lines that
+    do not start a new item are continuations of the previous description,
+    except a 'Count:' line, which gives the cluster size of a deduplicated item.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open_text(source) as lines:
+            yield from iter_descriptions(lines)
+        return
+
+    motivation = None
+    pending = None
+    count = 1
+    for line in source:
+        line = line.strip()
+        if line.startswith(MOTIVATION_HEADER):
+            if pending is not None:
+                yield IncidentDescription(motivation, pending, count)
+                pending = None
+            motivation = line[len(MOTIVATION_HEADER):].strip()
+        elif line == DESCRIPTION_HEADER:
+            continue
+        elif line.startswith(ITEM_PREFIX) or line == '-':
+            if pending is not None:
+                yield IncidentDescription(motivation, pending, count)
+            pending = line[len(ITEM_PREFIX):].strip()
+            count = 1
+        elif line.startswith(COUNT_HEADER) and pending is not None:
+            count = int(line[len(COUNT_HEADER):])
+        elif not line:
+            if pending is not None:
+                yield IncidentDescription(motivation, pending, count)
+                pending = None
+        elif pending is not None:
+            pending = f"{pending} {line}"
+    if pending is not None:
+        yield IncidentDescription(motivation, pending, count)
+
+
+def iter_benchmark_queries(source=DESCRIPTIONS_GERMANY, categories=None, limit_per_category=None,
+                           unique=False):
+    """
+    Stream (query, category keys) pairs for retrieval and classification benchmarks,
+    skipping incidents that fall outside the app's categories. With `unique`,
+    near-duplicate descriptions are collapsed first so clones do not fill the
+    per-category limit; this reads the whole file into memory.
+    """
+    records = iter_descriptions(source)
+    if unique:
+        records = deduplicate(records)
+    seen = Counter()
+    for record in records:
+        labels = record.categories
+        if not labels or (categories and not set(labels) & set(categories)):
+            continue
+        if limit_per_category and all(seen[label] >= limit_per_category for label in labels):
+            continue
+        seen.update(labels)
+        yield record.description, labels
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a categorized descriptions file.")
+    parser.add_argument('path', nargs='?', default=DESCRIPTIONS_GERMANY, help="Plain or gzip-compressed file")
+    args = parser.parse_args()
+
+    motivations = Counter()
+    for record in iter_descriptions(args.path):
+        motivations[record.motivation] += record.count
+    for motivation, count in motivations.most_common():
+        print(f"{count:6d}  {motivation}")
+    print(f"{sum(motivations.values()):6d}  total")
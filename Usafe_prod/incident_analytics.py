@@ -0,0 +1,117 @@
+import os
+
+import pandas as pd
+
+from incident_ingest import (
+    COUNTRY, DATA_DIR, DONE_MARKER, INCIDENT_TYPE, INCIDENTS_CSV, INCIDENTS_DATASET, MONTH, MOTIVATION,
+    dataset_readable, is_stale, load_incidents
+)
+
+CUBE_PARQUET = os.path.join(DATA_DIR, 'hate_crimes_cube.parquet')
+
+COUNT = 'Incidents'
+CUBE_DIMENSIONS = [COUNTRY, MOTIVATION, INCIDENT_TYPE, MONTH]
+
+
+def build_cube(incidents):
+    """
+    Count incidents for every observed country × motivation × incident type × month cell.
+    """
+    cube = (
+        incidents.groupby(CUBE_DIMENSIONS, observed=True, dropna=False)
+        .size()
+        .rename(COUNT)
+        .reset_index()
+    )
+    for column in (COUNTRY, MOTIVATION, INCIDENT_TYPE):
+        cube[column] = cube[column].astype('category')
+    cube[COUNT] = cube[COUNT].astype('int32')
+    return cube
+
+
+class IncidentCube:
+    """
+    Dashboard queries answered from the precomputed rollup instead of the raw rows.
+    """
+
+    def __init__(self, cube):
+        self.cube = cube
+
+    @property
+    def countries(self):
+        return sorted(self.cube[COUNTRY].cat.categories)
+
+    @property
+    def motivations(self):
+        return sorted(self.cube[MOTIVATION].cat.categories)
+
+    @property
+    def incident_types(self):
+        return sorted(self.cube[INCIDENT_TYPE].cat.categories)
+
+    def _slice(self, countries=None, motivations=None, incident_types=None, start=None, end=None):
+        mask = pd.Series(True, index=self.cube.index)
+        if countries:
+            mask &= self.cube[COUNTRY].isin(countries)
+        if motivations:
+            mask &= self.cube[MOTIVATION].isin(motivations)
+        if incident_types:
+            mask &= self.cube[INCIDENT_TYPE].isin(incident_types)
+        if start is not None:
+            mask &= self.cube[MONTH] >= pd.Timestamp(start)
+        if end is not None:
+            mask &= self.cube[MONTH] <= pd.Timestamp(end)
+        return self.cube[mask]
+
+    def counts_by(self, dimension, **filters):
+        """Total incidents per value of one dimension, largest first."""
+        return (
+            self._slice(**filters)
+            .groupby(dimension, observed=True)[COUNT]
+            .sum()
+            .sort_values(ascending=False)
+        )
+
+    def most_common_motivation(self, **filters):
+        """Most reported bias motivation per country."""
+        totals = (
+            self._slice(**filters)
+            .groupby([COUNTRY, MOTIVATION], observed=True)[COUNT]
+            .sum()
+            .reset_index()
+            .sort_values([COUNTRY, COUNT], ascending=[True, False])
+        )
+        return totals.drop_duplicates(COUNTRY).set_index(COUNTRY)[[MOTIVATION, COUNT]]
+
+    def crosstab(self, rows=MOTIVATION, columns=INCIDENT_TYPE, **filters):
+        """Incident counts for two dimensions as a wide table."""
+        return (
+            self._slice(**filters)
+            .pivot_table(index=rows, columns=columns, values=COUNT, aggfunc='sum', fill_value=0, observed=True)
+        )
+
+    def trend(self, by=MOTIVATION, freq='M', **filters):
+        """Incidents over time (monthly or yearly), one column per value of `by`."""
+        sliced = self._slice(**filters).dropna(subset=[MONTH])
+        period = sliced[MONTH].dt.to_period(freq).dt.to_timestamp()
+        return (
+            sliced.groupby([period, sliced[by]], observed=True)[COUNT]
+            .sum()
+            .unstack(fill_value=0)
+            .sort_index()
+        )
+
+
+def load_cube(csv_path=INCIDENTS_CSV, cube_path=CUBE_PARQUET, dataset_dir=INCIDENTS_DATASET):
+    """
+    Load the precomputed rollup, rebuilding it when the incident CSV has changed.
+    """
+    if is_stale(dataset_dir, csv_path) or not os.path.exists(cube_path) or (
+        os.path.getmtime(cube_path) < os.path.getmtime(os.path.join(dataset_dir, DONE_MARKER))
+    ):
+        incidents = load_incidents(columns=CUBE_DIMENSIONS, dataset_dir=dataset_dir, csv_path=csv_path)
+        cube = build_cube(incidents)
+        cube.to_parquet(cube_path, engine='pyarrow', index=False, use_dictionary=True)
+    else:
+        cube = pd.read_parquet(cube_path, engine='pyarrow')
+    return IncidentCube(cube)
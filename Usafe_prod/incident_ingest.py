@@ -0,0 +1,197 @@
+import argparse
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from dedup import deduplicate, shrink_report
+from descriptions import IncidentDescription
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+INCIDENTS_CSV = os.path.join(DATA_DIR, 'hate_crimes.csv')
+INCIDENTS_DATASET = os.path.join(DATA_DIR, 'hate_crimes_dataset')
+DESCRIPTIONS_GERMANY = os.path.join(DATA_DIR, 'categorized_descriptions_germany.txt')
+
+COUNTRY = 'Country'
+MOTIVATION = 'Bias motivations'
+INCIDENT_TYPE = 'Type of incident'
+DATE = 'Date'
+YEAR = 'Year'
+MONTH = 'Month'
+DESCRIPTION = 'Description'
+
+CATEGORICAL_COLUMNS = [COUNTRY, MOTIVATION, INCIDENT_TYPE, 'Source']
+PARTITION_COLUMNS = [COUNTRY, YEAR]
+# Written last, so a dataset without it is an interrupted ingestion
+DONE_MARKER = '_INGESTED'
+
+# Combined incident types are folded into their most severe component (see EDA notebook)
+INCIDENT_TYPE_REPLACEMENTS = {
+    'Attacks against property, Threats': 'Attacks against property',
+    'Threats, Violent attacks against people': 'Violent attacks against people',
+    'Attacks against property, Violent attacks against people': 'Violent attacks against people',
+}
+
+
+def read_incidents_csv(csv_path=INCIDENTS_CSV):
+    """
+    Read the raw incident CSV with categorical columns and typed Date, Year and Month.
+    """
+    df = pd.read_csv(csv_path, dtype={column: 'category' for column in CATEGORICAL_COLUMNS if column != INCIDENT_TYPE})
+    df[INCIDENT_TYPE] = df[INCIDENT_TYPE].replace(INCIDENT_TYPE_REPLACEMENTS).astype('category')
+    df[DATE] = pd.to_datetime(df[DATE], errors='coerce')
+    df[YEAR] = df[DATE].dt.year.astype('Int16')
+    df[MONTH] = df[DATE].dt.to_period('M').dt.to_timestamp()
+    return df
+
+
+def is_stale(dataset_dir=INCIDENTS_DATASET, csv_path=INCIDENTS_CSV):
+    """Return True if the dataset is missing, incomplete or older than the CSV."""
+    marker = os.path.join(dataset_dir, DONE_MARKER)
+    if not os.path.exists(marker):
+        return True
+    return os.path.exists(csv_path) and os.path.getmtime(marker) < os.path.getmtime(csv_path)
+
+
+def ingest_incidents(csv_path=INCIDENTS_CSV, dataset_dir=INCIDENTS_DATASET):
+    """
+    Convert the incident CSV into Parquet files partitioned by country and year.
+
+    The dataset is written next to the target and renamed into place, so readers
+    never see a half-written directory.
+    """
+    df = read_incidents_csv(csv_path)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    staging_dir = f"{dataset_dir}.tmp"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    ds.write_dataset(
+        table,
+        staging_dir,
+        format='parquet',
+        partitioning=PARTITION_COLUMNS,
+        partitioning_flavor='hive',
+        existing_data_behavior='overwrite_or_ignore',
+    )
+    open(os.path.join(staging_dir, DONE_MARKER), 'w').close()
+
+    shutil.rmtree(dataset_dir, ignore_errors=True)
+    os.replace(staging_dir, dataset_dir)
+    return dataset_dir
+
+
+def open_dataset(dataset_dir=INCIDENTS_DATASET):
+    """Open the partitioned dataset, discovering Country and Year from the directory names."""
+    return ds.dataset(dataset_dir, format='parquet', partitioning='hive', exclude_invalid_files=True)
+
+
+def dataset_readable(dataset_dir=INCIDENTS_DATASET):
+    """True if the dataset was written completely and has at least one Parquet file pyarrow can read."""
+    if not os.path.exists(os.path.join(dataset_dir, DONE_MARKER)):
+        return False
+    try:
+        fragment = next(iter(open_dataset(dataset_dir).get_fragments()), None)
+        return fragment is not None and fragment.physical_schema is not None
+    except (OSError, pa.ArrowException):
+        return False
+
+
+def build_filter(countries=None, start=None, end=None, motivations=None, incident_types=None):
+    """
+    Build a pyarrow filter expression. Country and year predicates prune whole
+    partition directories; the rest are pushed down to the Parquet row groups.
+    """
+    conditions = []
+    if countries:
+        conditions.append(ds.field(COUNTRY).isin(list(countries)))
+    if start is not None:
+        start = pd.Timestamp(start)
+        conditions.append(ds.field(YEAR) >= start.year)
+        conditions.append(ds.field(DATE) >= start.to_pydatetime())
+    if end is not None:
+        end = pd.Timestamp(end)
+        conditions.append(ds.field(YEAR) <= end.year)
+        conditions.append(ds.field(DATE) <= end.to_pydatetime())
+    if motivations:
+        conditions.append(ds.field(MOTIVATION).isin(list(motivations)))
+    if incident_types:
+        conditions.append(ds.field(INCIDENT_TYPE).isin(list(incident_types)))
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def load_incidents(countries=None, start=None, end=None, motivations=None, incident_types=None,
+                   columns=None, dataset_dir=INCIDENTS_DATASET, csv_path=INCIDENTS_CSV):
+    """
+    Load the incidents matching the given predicates, ingesting the CSV first if needed.
+    Only the partitions and row groups that can match are read.
+    """
+    if is_stale(dataset_dir, csv_path):
+        ingest_incidents(csv_path, dataset_dir)
+    table = open_dataset(dataset_dir).to_table(
+        columns=columns,
+        filter=build_filter(countries, start, end, motivations, incident_types),
+    )
+    df = table.to_pandas()
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns and df[column].dtype != 'category':
+            df[column] = df[column].astype('category')
+    return df
+
+
+def export_categorized_descriptions(output_file=DESCRIPTIONS_GERMANY, country='Germany',
+                                    dataset_dir=INCIDENTS_DATASET, csv_path=INCIDENTS_CSV, unique=False):
+    """
+    Write the descriptions of one country grouped by bias motivation, in the
+    format of data/categorized_descriptions_germany.txt. With `unique`,
+    near-duplicate descriptions are written once, followed by a 'Count:' line
+    with the size of their cluster; the shrink report is returned alongside.
+    """
+    df = load_incidents(countries=[country], columns=[MOTIVATION, DESCRIPTION],
+                        dataset_dir=dataset_dir, csv_path=csv_path)
+    df = df.dropna(subset=[DESCRIPTION])
+    records = [IncidentDescription(str(motivation), description)
+               for motivation, description in zip(df[MOTIVATION], df[DESCRIPTION])]
+    kept = deduplicate(records) if unique else records
+
+    grouped_descriptions = {}
+    for record in kept:
+        grouped_descriptions.setdefault(record.motivation, []).append(record)
+
+    with open(output_file, 'w', encoding='utf-8') as file:
+        for motivation, descriptions in sorted(grouped_descriptions.items()):
+            file.write(f"Bias Motivations: {motivation}\n")
+            file.write("Description:\n")
+            for record in descriptions:
+                file.write(f"- {record.description}\n")
+                if record.count > 1:
+                    file.write(f"Count: {record.count}\n")
+            file.write("\n")
+    return output_file, shrink_report(records, kept)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the incident CSV into a partitioned Parquet dataset.")
+    parser.add_argument('--csv', default=INCIDENTS_CSV, help="Path to hate_crimes.csv")
+    parser.add_argument('--output', default=INCIDENTS_DATASET, help="Dataset directory to write")
+    parser.add_argument('--export-descriptions', metavar='COUNTRY',
+                        help="Also write categorized_descriptions_<country>.txt for this country")
+    parser.add_argument('--dedupe', action='store_true',
+                        help="Write near-duplicate descriptions once, with their count")
+    args = parser.parse_args()
+
+    ingest_incidents(args.csv, args.output)
+    print(f"Incident dataset written to {args.output}")
+    if args.export_descriptions:
+        output_file = os.path.join(DATA_DIR, f"categorized_descriptions_{args.export_descriptions.lower()}.txt")
+        _, report = export_categorized_descriptions(output_file, args.export_descriptions, args.output, args.csv,
+                                                    unique=args.dedupe)
+        print(f"Descriptions for {args.export_descriptions} saved to {output_file}")
+        if args.dedupe:
+            print(f"Kept {report['kept']} of {report['records']} descriptions; "
+                  f"{report['reduction']:.1%} fewer benchmark and calibration queries to embed")
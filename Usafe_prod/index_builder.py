@@ -0,0 +1,223 @@
+import argparse
+import os
+
+import pdfplumber
+from langchain.docstore.document import Document
+from langchain_community.vectorstores import FAISS
+from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+import chunking
+from classifier import CategoryVoter, MultiLabelClassifier, save_calibration
+from descriptions import iter_benchmark_queries
+from index_store import new_version, publish, resolve_index
+from ood import OUT_OF_SCOPE_EXAMPLES, OutOfScopeGate
+from language import SUPPORTED_LANGUAGES
+from pipeline import (
+    COMBINED_INDEX, EMBEDDING_MODEL, MULTILINGUAL_EMBEDDING_MODEL, MULTILINGUAL_INDEX, language_index_path
+)
+from resource_catalog import DATA_DIR, load_catalog
+
+SPLITTERS = ('structural', 'recursive')
+
+
+# Step 1: Load PDFs using pdfplumber
+def extract_text_from_pdf(pdf_path):
+    """
+    Extracts text from a PDF using pdfplumber and returns a list of Document objects.
+    """
+    extracted_text = ""
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages:
+            page_text = page.extract_text()
+            if page_text:
+                extracted_text += page_text + "\n"
+    return [Document(page_content=extracted_text, metadata={"source": os.path.basename(pdf_path)})]
+
+
+def load_definition_documents(data_dir=DATA_DIR):
+    """Load the legal definition PDF of every category in the resource catalog."""
+    documents = []
+    for category in load_catalog().categories:
+        path = os.path.join(data_dir, category.source)
+        if os.path.exists(path):
+            documents.extend(extract_text_from_pdf(path))
+    return documents
+
+
+# Step 2: Chunk Documents
+def chunk_documents(documents, splitter='structural', chunk_size=1000, chunk_overlap=100):
+    """
+    Splits documents into smaller chunks for embedding.
+
+    'structural' follows headings, legal sections and sentence boundaries without
+    overlap; 'recursive' is the fixed-size RecursiveCharacterTextSplitter used so far.
+    """
+    if splitter == 'structural':
+        return chunking.chunk_documents(documents, max_chars=chunk_size)
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return text_splitter.split_documents(documents)
+
+
+# Step 3: Create Embedding Vector Store
+def create_vector_store(chunks, output_path=COMBINED_INDEX, embedding_model=None):
+    """
+    Creates a vector store using HuggingFace embeddings and saves it locally.
+    """
+    embedding_model = embedding_model or HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    vector_store = FAISS.from_documents(chunks, embedding=embedding_model)
+    vector_store.save_local(output_path)
+    return vector_store
+
+
+def publish_index(chunks, root=COMBINED_INDEX, embedding_model=None, model_name=EMBEDDING_MODEL,
+                  calibrate=False, queries_per_category=100, **metadata):
+    """
+    Build the index as a new version under `root`, optionally calibrate it, and
+    only then make it current, so running workers never load a half-built index.
+    """
+    embedding_model = embedding_model or HuggingFaceEmbeddings(model_name=model_name)
+    version, path = new_version(root)
+    create_vector_store(chunks, path, embedding_model)
+    if calibrate:
+        calibrate_index(path, queries_per_category, embedding_model=embedding_model)
+    publish(root, version, embedding_model=model_name, chunks=len(chunks), **metadata)
+    return path
+
+
+def build_multilingual_indexes(splitter='structural', chunk_size=1000, chunk_overlap=100,
+                               output_path=MULTILINGUAL_INDEX, calibrate=False, queries_per_category=100):
+    """
+    Build the shared cross-lingual index from the English definitions, plus one
+    index per language that has its own definitions under data/<language>/.
+    All of them use the multilingual encoder, so queries need no translation.
+    """
+    embedding_model = HuggingFaceEmbeddings(model_name=MULTILINGUAL_EMBEDDING_MODEL)
+    options = dict(embedding_model=embedding_model, model_name=MULTILINGUAL_EMBEDDING_MODEL,
+                   calibrate=calibrate, queries_per_category=queries_per_category, splitter=splitter)
+    built = {}
+    chunks = chunk_documents(load_definition_documents(), splitter, chunk_size, chunk_overlap)
+    built['shared'] = publish_index(chunks, output_path, **options)
+    for language in SUPPORTED_LANGUAGES:
+        language_dir = os.path.join(DATA_DIR, language)
+        if not os.path.isdir(language_dir):
+            continue
+        documents = load_definition_documents(language_dir)
+        if documents:
+            chunks = chunk_documents(documents, splitter, chunk_size, chunk_overlap)
+            built[language] = publish_index(chunks, language_index_path(language, output_path), **options)
+    return built
+
+
+def index_size(vector_store, chunks):
+    """Approximate in-memory size of an index: vectors plus stored chunk text, in bytes."""
+    vector_bytes = vector_store.index.ntotal * vector_store.index.d * 4
+    text_bytes = sum(len(chunk.page_content.encode('utf-8')) for chunk in chunks)
+    return vector_bytes + text_bytes
+
+
+def category_accuracy(vector_store, query_vectors, labels):
+    """Share of queries whose top-1 chunk comes from one of the query's categories."""
+    catalog = load_catalog()
+    hits = 0
+    for vector, expected in zip(query_vectors, labels):
+        top = vector_store.similarity_search_by_vector(vector, k=1)
+        category = catalog.category(top[0].metadata.get('source')) if top else None
+        hits += bool(category and category.key in expected)
+    return hits / len(labels) if labels else 0.0
+
+
+def compare_splitters(documents, queries_per_category=100, chunk_size=1000, chunk_overlap=100):
+    """
+    Build an in-memory index with each splitter and report chunk count, index
+    size and top-1 category accuracy on queries from the incident descriptions.
+    """
+    embedding_model = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    queries, labels = [], []
+    for query, categories in iter_benchmark_queries(limit_per_category=queries_per_category, unique=True):
+        queries.append(query)
+        labels.append(categories)
+    query_vectors = embedding_model.embed_documents(queries)
+
+    report = {}
+    for splitter in SPLITTERS:
+        chunks = chunk_documents(documents, splitter, chunk_size, chunk_overlap)
+        vector_store = FAISS.from_documents(chunks, embedding=embedding_model)
+        report[splitter] = {
+            'chunks': len(chunks),
+            'bytes': index_size(vector_store, chunks),
+            'accuracy': category_accuracy(vector_store, query_vectors, labels),
+        }
+    return report
+
+
+def calibrate_index(index_path=COMBINED_INDEX, queries_per_category=100, model_name=EMBEDDING_MODEL,
+                    embedding_model=None):
+    """
+    Fit the category vote temperature, the multi-label thresholds and the
+    out-of-scope gate on labelled incident descriptions and save them in the
+    index's calibration file.
+    """
+    embedding_model = embedding_model or HuggingFaceEmbeddings(model_name=model_name)
+    vector_store = FAISS.load_local(index_path, embedding_model, allow_dangerous_deserialization=True)
+    queries, labels = [], []
+    for query, categories in iter_benchmark_queries(limit_per_category=queries_per_category, unique=True):
+        queries.append(query)
+        labels.append(categories)
+    query_vectors = embedding_model.embed_documents(queries)
+    catalog = load_catalog()
+    temperature = CategoryVoter(vector_store, catalog).calibrate_temperature(query_vectors, labels)
+    label_thresholds = MultiLabelClassifier(vector_store, catalog).calibrate_thresholds(query_vectors, labels)
+    gate = OutOfScopeGate(vector_store, catalog)
+    ood = gate.calibrate(query_vectors)
+    rejected = gate.rejects(embedding_model.embed_documents(list(OUT_OF_SCOPE_EXAMPLES)))
+    print(f"Out-of-scope gate rejects {rejected.mean():.0%} of the off-topic examples")
+    return save_calibration(index_path, temperature=temperature, label_thresholds=label_thresholds, ood=ood)
+
+
+def print_report(report):
+    """Print a splitter comparison, relative to the recursive baseline."""
+    baseline = report['recursive']
+    print(f"{'splitter':<12}{'chunks':>8}{'size (KB)':>12}{'reduction':>11}{'top-1 acc':>11}")
+    for splitter, row in report.items():
+        reduction = 1 - row['bytes'] / baseline['bytes'] if baseline['bytes'] else 0.0
+        print(f"{splitter:<12}{row['chunks']:>8}{row['bytes'] / 1024:>12.1f}{reduction:>10.1%}{row['accuracy']:>11.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the combined hate crime definition index.")
+    parser.add_argument('--splitter', choices=SPLITTERS, default='structural')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--chunk-overlap', type=int, default=100, help="Only used by the recursive splitter")
+    parser.add_argument('--output', default=None, help="Index directory (default depends on --multilingual)")
+    parser.add_argument('--multilingual', action='store_true',
+                        help="Build the shared cross-lingual index and any per-language indexes")
+    parser.add_argument('--compare', action='store_true',
+                        help="Compare splitters on index size and category accuracy instead of building")
+    parser.add_argument('--calibrate', action='store_true',
+                        help="Fit the vote temperature and multi-label thresholds before publishing the new version")
+    parser.add_argument('--calibrate-only', action='store_true',
+                        help="Only calibrate the current version of the index at --output")
+    parser.add_argument('--queries-per-category', type=int, default=100)
+    args = parser.parse_args()
+
+    output = args.output or (MULTILINGUAL_INDEX if args.multilingual else COMBINED_INDEX)
+    model_name = MULTILINGUAL_EMBEDDING_MODEL if args.multilingual else EMBEDDING_MODEL
+    if args.calibrate_only:
+        calibration = calibrate_index(resolve_index(output), args.queries_per_category, model_name)
+        print(f"Calibration saved: {calibration}")
+        raise SystemExit
+    if args.multilingual:
+        for language, path in build_multilingual_indexes(args.splitter, args.chunk_size, args.chunk_overlap,
+                                                         output, args.calibrate, args.queries_per_category).items():
+            print(f"{language} index published at {path}")
+        raise SystemExit
+
+    documents = load_definition_documents()
+    if args.compare:
+        print_report(compare_splitters(documents, args.queries_per_category, args.chunk_size, args.chunk_overlap))
+    else:
+        chunks = chunk_documents(documents, args.splitter, args.chunk_size, args.chunk_overlap)
+        path = publish_index(chunks, output, calibrate=args.calibrate,
+                             queries_per_category=args.queries_per_category, splitter=args.splitter)
+        print(f"Vector store with {len(chunks)} chunks published at {path}")
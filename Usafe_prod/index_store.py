@@ -0,0 +1,182 @@
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+MANIFEST = 'manifest.json'
+VERSIONS_DIR = 'versions'
+
+
+def read_manifest(root):
+    """The manifest of a versioned index directory, or None for a plain index directory."""
+    path = os.path.join(root, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def write_manifest(root, manifest):
+    """Replace the manifest atomically, so readers see either the old or the new one."""
+    path = os.path.join(root, MANIFEST)
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=2)
+    os.replace(temporary, path)
+
+
+def current_version(root):
+    manifest = read_manifest(root)
+    return manifest['current'] if manifest else None
+
+
+def version_path(root, version):
+    return os.path.join(root, VERSIONS_DIR, version)
+
+
+def resolve_index(root):
+    """
+    Directory holding the live index files: the current version of a versioned
+    index, or `root` itself for an index saved directly there.
+    """
+    version = current_version(root)
+    return version_path(root, version) if version else root
+
+
+def new_version(root):
+    """
+    Reserve a directory for the next version. It is not served until
+    `publish()` makes it current, so it can be built and calibrated first.
+    """
+    version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+    path = version_path(root, version)
+    os.makedirs(path)
+    return version, path
+
+
+def publish(root, version, keep=3, **metadata):
+    """Make `version` current and delete all but the `keep` newest versions."""
+    manifest = read_manifest(root) or {'versions': {}}
+    manifest['versions'][version] = {'created': time.time(), **metadata}
+    manifest['current'] = version
+    retired = sorted(manifest['versions'])[:-keep] if keep else []
+    for old in retired:
+        if old != version:
+            del manifest['versions'][old]
+    write_manifest(root, manifest)
+    for old in retired:
+        if old != version:
+            shutil.rmtree(version_path(root, old), ignore_errors=True)
+    return manifest
+
+
+class _Generation:
+    """One loaded index version and the requests currently using it."""
+
+    def __init__(self, version, pipeline):
+        self.version = version
+        self.pipeline = pipeline
+        self.active = 0
+        self.retired = False
+
+
+class ReloadablePipeline:
+    """
+    Serves a versioned index and switches to a new version without a restart.
+
+    A watcher thread polls the manifest. When the current version changes it
+    loads the new index in the background, reusing the already loaded encoder
+    and sentiment analyzer, and then swaps it in with a single assignment.
+    Requests hold a lease on the version they started with; the old index is
+    released once the last of them has finished.
+    """
+
+    def __init__(self, root, pipeline, version, loader, interval=30):
+        self.root = root
+        self._loader = loader           # (index_path, current pipeline) -> new pipeline
+        self._lock = threading.Lock()
+        self._generation = _Generation(version, pipeline)
+        self.interval = interval
+        self.reloads = 0
+        self.failures = 0
+        self._stop = threading.Event()
+        self._watcher = None
+        if interval:
+            self._watcher = threading.Thread(target=self._watch, name='index-watcher', daemon=True)
+            self._watcher.start()
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # The watcher thread does not survive fork(), and is deliberately not restarted: a
+        # pre-forked worker (prefork.py) would load a private copy of every new version.
+        # The parent keeps watching and re-forks the workers once it has loaded one.
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    @property
+    def version(self):
+        return self._generation.version
+
+    @property
+    def current(self):
+        return self._generation.pipeline
+
+    @contextmanager
+    def lease(self):
+        """The pipeline to use for one request; its index stays loaded until the block exits."""
+        with self._lock:
+            generation = self._generation
+            generation.active += 1
+        try:
+            yield generation.pipeline
+        finally:
+            with self._lock:
+                generation.active -= 1
+                if generation.retired and generation.active == 0:
+                    generation.pipeline = None
+
+    def reload(self):
+        """Load the manifest's current version if it is not the one being served."""
+        version = current_version(self.root)
+        if version is None or version == self.version:
+            return False
+        pipeline = self._loader(version_path(self.root, version), self.current)
+        with self._lock:
+            old, self._generation = self._generation, _Generation(version, pipeline)
+            old.retired = True
+            if old.active == 0:
+                old.pipeline = None
+        self.reloads += 1
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.reload()
+            except Exception as exc:
+                # Keep serving the loaded version; a half-written version is retried next poll
+                self.failures += 1
+                print(f"Index reload failed: {exc}")
+
+    def stop(self):
+        self._stop.set()
+
+    def sentiment(self, text):
+        with self.lease() as pipeline:
+            return pipeline.sentiment(text)
+
+    def classify(self, text):
+        with self.lease() as pipeline:
+            return pipeline.classify(text)
+
+    def classify_turn(self, conversation, text):
+        with self.lease() as pipeline:
+            return pipeline.classify_turn(conversation, text)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.current, name)
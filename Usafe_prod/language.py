@@ -0,0 +1,50 @@
+import re
+
+SUPPORTED_LANGUAGES = ('en', 'de', 'tr')
+
+# Short, high-frequency function words; enough to tell the supported languages apart
+STOPWORDS = {
+    'en': frozenset("""
+        the a an and or but of to in on at for with from by is was were are be been have has had
+        i me my we our you your he him his she her they them their it this that there not no
+        what when who because after before while just so very""".split()),
+    'de': frozenset("""
+        der die das den dem des ein eine einen einem einer und oder aber nicht kein keine ist war
+        waren sind bin bist hat habe hatte ich mich mir mein meine wir uns du dich dir er ihn ihm
+        sie ihr es wurde wurden weil als wenn auf mit von zu im am für aus nach bei auch noch nur
+        sehr schon mal jetzt hier""".split()),
+    'tr': frozenset("""
+        ve veya ama bir bu şu o ben sen biz siz onlar beni bana benim bizi bize değil yok var
+        için ile gibi çok daha sonra önce ama ki de da mi mı mu mü ne neden çünkü şimdi burada
+        bana beni oldu olan olarak diye""".split()),
+}
+
+# Letters that only occur in one of the supported languages (ö and ü are shared by de and tr)
+DISTINCTIVE_LETTERS = {
+    'de': frozenset('äß'),
+    'tr': frozenset('çğışİ'),
+}
+
+WORD = re.compile(r"[^\W\d_]+")
+
+
+def detect_language(text, default=None):
+    """
+    Guess the language of a short text from function words and distinctive
+    letters. Returns a code from SUPPORTED_LANGUAGES, or `default` when there
+    is no signal.
+    """
+    words = WORD.findall(text.lower())
+    scores = dict.fromkeys(SUPPORTED_LANGUAGES, 0.0)
+    for word in words:
+        for language, stopwords in STOPWORDS.items():
+            if word in stopwords:
+                scores[language] += 1
+    letters = set(text)
+    for language, distinctive in DISTINCTIVE_LETTERS.items():
+        scores[language] += 2 * len(letters & distinctive)
+
+    best = max(scores, key=scores.get)
+    if scores[best] == 0:
+        return default
+    return best
@@ -0,0 +1,311 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import resource
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from conversation import Conversation, first_sentence
+from descriptions import DESCRIPTIONS_GERMANY, iter_descriptions
+
+APP_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Usafe.py')
+
+
+def make_submissions(source=DESCRIPTIONS_GERMANY, limit=500, max_chars=300, seed=0):
+    """
+    Short, form-sized submissions from the incident descriptions: the opening
+    sentence of each report, shuffled so consecutive requests differ.
+    """
+    submissions = [first_sentence(record.description, max_chars) for record in iter_descriptions(source)]
+    submissions = [text for text in submissions if text]
+    random.Random(seed).shuffle(submissions)
+    return submissions[:limit]
+
+
+def rss_bytes():
+    """Current resident set size of this process."""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # Peak RSS is the best portable fallback (kilobytes on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+class MockLLM:
+    """Stands in for the chat model: a fixed delay with jitter and a canned reply."""
+
+    def __init__(self, latency_ms=800, jitter_ms=200, seed=0):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt):
+        with self._lock:
+            delay = max(0.0, self._random.gauss(self.latency, self.jitter))
+        time.sleep(delay)
+        return "Thank you for sharing this with me."
+
+
+class PipelineTarget:
+    """
+    One submission as the app handles it: sentiment, classification, optional
+    LLM reply. With an admission-controlled pipeline, classification goes
+    through its encoder queue on `executor`, as in Usafe.py.
+    """
+
+    name = 'pipeline'
+
+    def __init__(self, pipeline, llm=None, prompts=None, executor=None):
+        self.pipeline = pipeline
+        self.llm = llm
+        self.prompts = prompts
+        self.executor = executor
+
+    def __call__(self, text):
+        self.pipeline.sentiment(text)
+        if self.executor is not None:
+            classification = self.pipeline.submit_classification(self.executor, Conversation(), text).result()
+        else:
+            classification = self.pipeline.classify(text)
+        if self.llm is not None:
+            category = classification.category.key if classification.category else None
+            prompt = self.prompts.render('description', category) if category else self.prompts.render('fallback')
+            self.llm.invoke(prompt)
+
+
+class StreamlitTarget:
+    """
+    Runs the whole Usafe.py script per submission through Streamlit's AppTest,
+    as a new browser session would. Cached resources are shared across
+    sessions exactly as in a server process. `district` is picked in the
+    optional district field, which the form only shows with USAFE_TRENDS_DB.
+    The app makes no LLM call, so there is nothing to mock here.
+    """
+
+    name = 'streamlit'
+
+    def __init__(self, script=APP_SCRIPT, timeout=30, district=None):
+        from streamlit.testing.v1 import AppTest
+        self._app_test = AppTest
+        self.script = script
+        self.timeout = timeout
+        self.district = district
+        # Warm the cached pipeline so the first measured session does not pay for loading
+        self(make_submissions(limit=1)[0])
+
+    def __call__(self, text):
+        app = self._app_test.from_file(self.script, default_timeout=self.timeout)
+        app.run()
+        app.text_area(key='user_input').input(text)
+        if self.district is not None:
+            app.selectbox(key='district').select(self.district)
+        app.button[0].click().run()
+        if app.exception:
+            raise RuntimeError(app.exception[0].message)
+
+
+@dataclass
+class StepResult:
+    concurrency: int
+    requests: int
+    errors: int
+    throughput: float       # requests per second
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    cpu_percent: float      # of one core, mean over the step
+    cpu_peak_percent: float # highest over one sampling interval
+    rss_mb: float           # mean over the step
+    rss_peak_mb: float
+
+
+class ResourceSampler:
+    """Samples this process's RSS and CPU use every `interval` seconds from a background thread."""
+
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.rss = []
+        self.cpu = []               # percent of one core over each interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='resource-sampler', daemon=True)
+
+    def _run(self):
+        cpu, at = cpu_seconds(), time.perf_counter()
+        self.rss.append(rss_bytes())
+        while not self._stop.wait(self.interval):
+            now_cpu, now = cpu_seconds(), time.perf_counter()
+            self.cpu.append(100 * (now_cpu - cpu) / (now - at))
+            self.rss.append(rss_bytes())
+            cpu, at = now_cpu, now
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.rss.append(rss_bytes())
+
+
+def run_step(target, submissions, concurrency, duration):
+    """
+    Keep `concurrency` simulated users submitting back to back for `duration`
+    seconds, sampling memory and CPU while they run.
+    """
+    latencies, errors = [], []
+    lock = threading.Lock()
+    counter = itertools.count()
+    deadline = time.perf_counter() + duration
+
+    def user():
+        while time.perf_counter() < deadline:
+            text = submissions[next(counter) % len(submissions)]
+            started = time.perf_counter()
+            try:
+                target(text)
+            except Exception as exc:
+                with lock:
+                    errors.append(exc)
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    cpu_started, started = cpu_seconds(), time.perf_counter()
+    with ResourceSampler() as sampler:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for _ in range(concurrency):
+                pool.submit(user)
+    elapsed = time.perf_counter() - started
+    cpu = cpu_seconds() - cpu_started
+
+    latencies_ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return StepResult(
+        concurrency=concurrency,
+        requests=len(latencies),
+        errors=len(errors),
+        throughput=len(latencies) / elapsed,
+        p50_ms=float(p50),
+        p95_ms=float(p95),
+        p99_ms=float(p99),
+        cpu_percent=100 * cpu / elapsed,
+        cpu_peak_percent=max(sampler.cpu, default=100 * cpu / elapsed),
+        rss_mb=float(np.mean(sampler.rss)) / 2 ** 20,
+        rss_peak_mb=max(sampler.rss) / 2 ** 20,
+    )
+
+
+def saturation_point(results, slo_ms, min_gain=0.1):
+    """
+    The highest concurrency that still meets the p95 SLO and was worth adding:
+    past it, throughput grows by less than `min_gain` or the SLO breaks.
+    """
+    best = None
+    for previous, step in zip([None] + results[:-1], results):
+        if step.p95_ms > slo_ms or step.errors:
+            break
+        if previous is not None and step.throughput < previous.throughput * (1 + min_gain):
+            break
+        best = step
+    return best
+
+
+def ramp(target, submissions, levels, duration, slo_ms, report=print):
+    results = []
+    for concurrency in levels:
+        step = run_step(target, submissions, concurrency, duration)
+        results.append(step)
+        report(format_step(step))
+        if step.p95_ms > 2 * slo_ms:
+            report(f"p95 is over twice the SLO, stopping the ramp at {concurrency} users")
+            break
+    return results
+
+
+HEADER = (f"{'users':>6}{'reqs':>7}{'errs':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'cpu %':>8}{'peak':>7}{'rss MB':>9}{'peak':>7}")
+
+
+def format_step(step):
+    return (f"{step.concurrency:>6}{step.requests:>7}{step.errors:>6}{step.throughput:>9.2f}"
+            f"{step.p50_ms:>9.0f}{step.p95_ms:>9.0f}{step.p99_ms:>9.0f}"
+            f"{step.cpu_percent:>8.0f}{step.cpu_peak_percent:>7.0f}{step.rss_mb:>9.0f}{step.rss_peak_mb:>7.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ramp concurrent simulated users against the Usafe pipeline.")
+    parser.add_argument('--target', choices=('pipeline', 'streamlit'), default='pipeline')
+    parser.add_argument('--levels', default='1,2,4,8,16,32', help="Comma-separated concurrency levels")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds per level")
+    parser.add_argument('--slo-ms', type=float, default=2000, help="p95 latency objective")
+    parser.add_argument('--submissions', type=int, default=500)
+    parser.add_argument('--mock-llm-ms', type=float, default=None,
+                        help="Add a mock LLM reply with this mean latency to every pipeline request "
+                             "(pipeline target only: the app itself makes no LLM call)")
+    parser.add_argument('--district', help="Berlin district to pick in the form (streamlit target, needs USAFE_TRENDS_DB)")
+    parser.add_argument('--admission', metavar='HIGH,LOW',
+                        help="Put admission control with these encoder watermarks in front of the pipeline")
+    parser.add_argument('--output', help="Write the results as JSON")
+    args = parser.parse_args()
+
+    if args.target == 'streamlit' and args.mock_llm_ms is not None:
+        parser.error("--mock-llm-ms only applies to --target pipeline")
+    if args.target == 'pipeline' and args.district is not None:
+        parser.error("--district only applies to --target streamlit")
+
+    submissions = make_submissions(limit=args.submissions)
+    if args.target == 'streamlit':
+        target = StreamlitTarget(district=args.district)
+    else:
+        from pipeline import create_pipeline
+        from prompts import load_prompts
+        llm = MockLLM(args.mock_llm_ms) if args.mock_llm_ms is not None else None
+        pipeline, executor = create_pipeline(), None
+        if args.admission:
+            from admission import AdmissionController, AdmissionControlledPipeline
+            high, low = (int(value) for value in args.admission.split(','))
+            pipeline = AdmissionControlledPipeline(pipeline, AdmissionController({'encoder': (high, low)}, log_every=0))
+            executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='usafe-model')
+        target = PipelineTarget(pipeline, llm=llm, prompts=load_prompts(), executor=executor)
+        target(submissions[0])
+
+    print(f"{target.name}: {len(submissions)} submissions, {args.duration:.0f}s per level, p95 SLO {args.slo_ms:.0f} ms")
+    print(HEADER)
+    results = ramp(target, submissions, [int(level) for level in args.levels.split(',')], args.duration, args.slo_ms)
+    saturation = saturation_point(results, args.slo_ms)
+    if saturation is None:
+        print("Saturated already at the lowest level")
+    else:
+        print(f"Saturation point: {saturation.concurrency} users at {saturation.throughput:.2f} req/s "
+              f"(p95 {saturation.p95_ms:.0f} ms)")
+
+    gate = getattr(getattr(target, 'pipeline', None), 'gate', None)
+    if gate is not None:
+        print(f"Out-of-scope gate rejected {gate.rejection_rate:.1%} of {gate.checked} submissions")
+    controller = getattr(getattr(target, 'pipeline', None), 'controller', None)
+    if controller is not None:
+        print(controller.report())
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump({
+                'target': target.name,
+                'slo_ms': args.slo_ms,
+                'mock_llm_ms': args.mock_llm_ms,
+                'steps': [asdict(step) for step in results],
+                'saturation': saturation.concurrency if saturation else None,
+            }, file, indent=2)
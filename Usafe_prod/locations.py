@@ -0,0 +1,150 @@
+import argparse
+import csv
+import math
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from resource_catalog import DATA_DIR, GENERAL, load_catalog
+
+POSTCODES_PATH = os.path.join(DATA_DIR, 'berlin_postcodes.csv')
+# Every Berlin postcode falls in this range; a code inside it that the table lacks is still a Berlin code
+BERLIN_POSTCODES = range(10115, 14200)
+
+# Community organizations in the catalog (LesMigraS, GLADT, Hydra) also counsel victims
+RELATED_TYPES = {'counselling': ('counselling', 'community')}
+
+# Flat projection around Berlin's latitude; the error over the city is far below a postcode's size
+BERLIN_LATITUDE = 52.52
+KM_PER_DEGREE_LAT = 111.2
+KM_PER_DEGREE_LON = KM_PER_DEGREE_LAT * math.cos(math.radians(BERLIN_LATITUDE))
+
+
+@dataclass(frozen=True)
+class Place:
+    postcode: str
+    district: str
+    locality: str
+    lat: float
+    lon: float
+
+
+def project(lat, lon):
+    """Kilometre coordinates in which Euclidean distance is ground distance."""
+    return np.array([lon * KM_PER_DEGREE_LON, lat * KM_PER_DEGREE_LAT])
+
+
+class Gazetteer:
+    """
+    Offline geocoding from the bundled postcode table: a postcode resolves to
+    its centroid, a district or locality name to the mean of its postcodes.
+    """
+
+    def __init__(self, places):
+        self.places = tuple(places)
+        self._points = {place.postcode: (place.lat, place.lon) for place in self.places}
+        areas = {}
+        for place in self.places:
+            for name in (place.district, place.locality):
+                areas.setdefault(name.lower(), []).append((place.lat, place.lon))
+        for name, points in areas.items():
+            self._points.setdefault(name, tuple(np.mean(points, axis=0)))
+
+    @property
+    def districts(self):
+        return sorted({place.district for place in self.places})
+
+    @staticmethod
+    def is_berlin_postcode(query):
+        query = query.strip()
+        return len(query) == 5 and query.isdigit() and int(query) in BERLIN_POSTCODES
+
+    def locate(self, query):
+        """(lat, lon) of a postcode, district or locality, or None when it is not in the table."""
+        return self._points.get(query.strip().lower())
+
+
+@lru_cache(maxsize=None)
+def load_gazetteer(path=POSTCODES_PATH):
+    with open(path, encoding='utf-8', newline='') as file:
+        return Gazetteer(
+            Place(row['postcode'], row['district'], row['locality'], float(row['lat']), float(row['lon']))
+            for row in csv.DictReader(file)
+        )
+
+
+class ResourceLocator:
+    """
+    Nearest-resource lookup over the catalog entries that have a postcode.
+
+    Like the catalog's own index, one KD-tree is built per (category, type)
+    combination, with None standing for "any", so a filtered query searches
+    only the matching resources instead of filtering afterwards.
+    """
+
+    def __init__(self, catalog=None, gazetteer=None):
+        self.catalog = catalog or load_catalog()
+        self.gazetteer = gazetteer or load_gazetteer()
+        groups = {}
+        for resource in self.catalog.resources:
+            point = self.gazetteer.locate(resource.postcode) if resource.postcode else None
+            if point is None:
+                continue
+            for category in resource.categories + (None,):
+                for type_ in (resource.type, None):
+                    groups.setdefault((category, type_), []).append((resource, point))
+        self._trees = {}
+        for key, located in groups.items():
+            resources = tuple(resource for resource, _ in located)
+            tree = cKDTree(np.stack([project(*point) for _, point in located]))
+            self._trees[key] = (tree, resources)
+
+    def nearest(self, where, category=None, type=None, k=3):
+        """
+        The `k` closest resources to `where` (a postcode, district or (lat, lon)
+        pair) as (resource, distance in km) pairs, closest first. Category
+        filters match category-specific entries only; pass 'general' for the
+        general ones; 'counselling' also finds community organizations.
+        Returns [] when `where` cannot be geocoded.
+        """
+        point = self.gazetteer.locate(where) if isinstance(where, str) else where
+        if point is None:
+            return []
+        if category is not None and category != GENERAL:
+            resolved = self.catalog.category(category)
+            category = resolved.key if resolved else category
+        found = []
+        for type_ in RELATED_TYPES.get(type, (type,)):
+            entry = self._trees.get((category, type_))
+            if entry is None:
+                continue
+            tree, resources = entry
+            distances, indices = tree.query(project(*point), k=min(k, len(resources)))
+            found += [(resources[i], float(d)) for d, i in zip(np.atleast_1d(distances), np.atleast_1d(indices))]
+        return sorted(found, key=lambda pair: pair[1])[:k]
+
+
+@lru_cache(maxsize=None)
+def load_locator():
+    return ResourceLocator()
+
+
+if __name__ == "__main__":
+    import timeit
+
+    parser = argparse.ArgumentParser(description="Find the support organizations and police stations nearest to a place.")
+    parser.add_argument('where', help="Berlin postcode, district or locality")
+    parser.add_argument('--category', help="Category key or label, e.g. gender_lgbt")
+    parser.add_argument('--type', help="Resource type, e.g. police or counselling")
+    parser.add_argument('-k', type=int, default=3)
+    args = parser.parse_args()
+
+    locator = load_locator()
+    for resource, distance in locator.nearest(args.where, args.category, args.type, args.k):
+        print(f"{distance:5.1f} km  {resource.name} ({resource.address}, {resource.postcode})")
+    runs = 10000
+    seconds = timeit.timeit(lambda: locator.nearest(args.where, args.category, args.type, args.k), number=runs)
+    print(f"{seconds / runs * 1e6:.1f} µs per query")
@@ -0,0 +1,178 @@
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from loadtest import make_submissions, rss_bytes
+
+MB = 2 ** 20
+
+
+@dataclass
+class Component:
+    name: str
+    rss: int        # growth of the resident set while loading, bytes
+    python: int     # of which traced Python allocations, bytes
+
+
+class MemoryProfiler:
+    """
+    Attributes a worker's memory to the resources it loads. Each component is
+    loaded inside `measure()`, which records the RSS growth and, through
+    tracemalloc, the part allocated by Python objects (native libraries such as
+    torch and FAISS only show up in RSS).
+    """
+
+    def __init__(self, trace=True):
+        self.trace = trace
+        if trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        gc.collect()
+        self.baseline = rss_bytes()
+        self.components = []
+
+    def _python_bytes(self):
+        return tracemalloc.get_traced_memory()[0] if self.trace else 0
+
+    @contextmanager
+    def measure(self, name):
+        gc.collect()
+        rss, python = rss_bytes(), self._python_bytes()
+        yield
+        gc.collect()
+        self.components.append(Component(name, rss_bytes() - rss, self._python_bytes() - python))
+
+    @property
+    def total(self):
+        return rss_bytes()
+
+    def report(self):
+        lines = [f"{'component':<28}{'RSS MB':>10}{'Python MB':>12}",
+                 f"{'interpreter':<28}{self.baseline / MB:>10.1f}{'':>12}"]
+        for component in self.components:
+            lines.append(f"{component.name:<28}{component.rss / MB:>10.1f}{component.python / MB:>12.1f}")
+        lines.append(f"{'total':<28}{self.total / MB:>10.1f}")
+        return "\n".join(lines)
+
+
+def profile_startup(profiler):
+    """
+    Load everything Usafe.py loads, one component at a time, and return the
+    pipeline assembled from those components, wrapped for hot reloading like
+    create_pipeline() does when the index is versioned.
+    """
+    with profiler.measure('torch'):
+        import torch  # noqa: F401
+    with profiler.measure('streamlit'):
+        import streamlit  # noqa: F401
+    with profiler.measure('langchain + faiss'):
+        import pipeline
+    if pipeline.env_flag('USAFE_MULTILINGUAL'):
+        # Several indexes behind one encoder; measured as a whole
+        with profiler.measure('multilingual pipeline'):
+            return pipeline.create_pipeline()
+
+    with profiler.measure('nltk vader'):
+        from nltk.sentiment.vader import SentimentIntensityAnalyzer
+        pipeline.load_bundle()
+        analyzer = SentimentIntensityAnalyzer()
+    with profiler.measure('encoder weights'):
+        embeddings = pipeline.load_embeddings()
+    version = pipeline.current_version(pipeline.COMBINED_INDEX)
+    index_path = pipeline.version_path(pipeline.COMBINED_INDEX, version) if version else pipeline.COMBINED_INDEX
+    with profiler.measure('faiss index + docstore'):
+        vector_store = pipeline.load_vector_store(index_path, embeddings)
+    # Split the vector store into the raw vectors and the unpickled docstore
+    index_bytes = vector_store.index.ntotal * vector_store.index.d * 4
+    store = profiler.components.pop()
+    profiler.components.append(Component('faiss index', index_bytes, 0))
+    # RSS growth can undercount when the allocator reuses freed pages, so never report a negative docstore
+    profiler.components.append(Component('docstore (index.pkl)', max(0, store.rss - index_bytes), store.python))
+
+    with profiler.measure('classifiers + catalog'):
+        usafe = pipeline.UsafePipeline.load(index_path, embeddings, analyzer, vector_store=vector_store)
+    with profiler.measure('prompts'):
+        from prompts import load_prompts
+        load_prompts()
+    return pipeline.watch_index(usafe, version) if version else usafe
+
+
+def steady_state(pipeline, submissions, warmup=50, requests=500):
+    """
+    Serve `warmup` requests, then measure memory growth over `requests` more.
+    Returns (RSS bytes per request, Python bytes per request).
+    """
+    def serve(count, offset=0):
+        for i in range(count):
+            text = submissions[(offset + i) % len(submissions)]
+            pipeline.sentiment(text)
+            pipeline.classify(text)
+
+    serve(warmup)
+    gc.collect()
+    rss = rss_bytes()
+    python = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+    serve(requests, offset=warmup)
+    gc.collect()
+    python_growth = tracemalloc.get_traced_memory()[0] - python if tracemalloc.is_tracing() else 0
+    return (rss_bytes() - rss) / requests, python_growth / requests
+
+
+def budget_violations(total, growth_per_request, budget_mb=None, max_growth_kb=None):
+    """Messages for every configured budget that is exceeded; empty when within budget."""
+    violations = []
+    if budget_mb is not None and total > budget_mb * MB:
+        violations.append(f"worker RSS {total / MB:.0f} MB exceeds the {budget_mb:.0f} MB budget")
+    if max_growth_kb is not None and growth_per_request > max_growth_kb * 1024:
+        violations.append(f"steady-state growth {growth_per_request / 1024:.1f} KB/request "
+                          f"exceeds {max_growth_kb:.1f} KB/request")
+    return violations
+
+
+def log_startup_profile():
+    """
+    Memory instrumentation mode for the app (USAFE_MEMORY_PROFILE): load the
+    pipeline component by component and print where the memory went.
+    """
+    profiler = MemoryProfiler()
+    started = time.perf_counter()
+    usafe = profile_startup(profiler)
+    print(profiler.report(), file=sys.stderr)
+    print(f"startup took {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    tracemalloc.stop()
+    return usafe
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report per-component memory of a Usafe worker and check budgets.")
+    parser.add_argument('--requests', type=int, default=500, help="Requests used to measure steady-state growth")
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--no-trace', action='store_true',
+                        help="Skip tracemalloc, whose own bookkeeping inflates RSS, for an exact budget check")
+    parser.add_argument('--budget-mb', type=float, default=os.getenv('USAFE_MEMORY_BUDGET_MB'),
+                        help="Fail when the worker RSS after startup and load exceeds this")
+    parser.add_argument('--max-growth-kb', type=float, default=os.getenv('USAFE_MEMORY_GROWTH_KB'),
+                        help="Fail when steady-state RSS growth per request exceeds this")
+    args = parser.parse_args()
+
+    profiler = MemoryProfiler(trace=not args.no_trace)
+    usafe = profile_startup(profiler)
+    print(profiler.report())
+
+    rss_growth, python_growth = steady_state(usafe, make_submissions(), args.warmup, args.requests)
+    print(f"\nsteady state over {args.requests} requests: {rss_growth / 1024:.1f} KB RSS/request, "
+          f"{python_growth / 1024:.1f} KB Python/request")
+
+    violations = budget_violations(
+        profiler.total,
+        rss_growth,
+        float(args.budget_mb) if args.budget_mb is not None else None,
+        float(args.max_growth_kb) if args.max_growth_kb is not None else None,
+    )
+    for violation in violations:
+        print(f"FAIL: {violation}")
+    raise SystemExit(1 if violations else 0)
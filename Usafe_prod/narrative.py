@@ -0,0 +1,131 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from chunking import split_sentences
+from classifier import DEFAULT_TEMPERATURE, category_centroids, normalize
+from conversation import count_tokens
+
+POOLING = ('max', 'attention')
+
+# Inputs above this many tokens are encoded window by window; all-mpnet-base-v2
+# truncates at 384 word pieces, and a word is often more than one piece
+LONG_INPUT_TOKENS = 200
+WINDOW_TOKENS = 96
+MAX_WINDOWS = 16
+
+
+def _cut(sentence, limit):
+    """Split a run-on sentence (no punctuation, as users often type) into pieces of `limit` tokens."""
+    words = sentence.split()
+    pieces, current = [], []
+    for word in words:
+        if current and count_tokens(' '.join(current + [word])) > limit:
+            pieces.append(' '.join(current))
+            current = []
+        current.append(word)
+    if current:
+        pieces.append(' '.join(current))
+    return pieces
+
+
+def sentence_windows(text, window_tokens=WINDOW_TOKENS):
+    """
+    Group consecutive sentences into windows of at most `window_tokens` tokens.
+    Each window after the first starts with the last sentence of the previous
+    one, so an incident described across a sentence boundary stays together.
+    """
+    sentences = []
+    for paragraph in text.splitlines():
+        for sentence in split_sentences(paragraph):
+            sentences.extend(_cut(sentence, window_tokens) if count_tokens(sentence) > window_tokens else [sentence])
+
+    windows, current = [], []
+    for sentence in sentences:
+        if current and count_tokens(' '.join(current + [sentence])) > window_tokens:
+            windows.append(' '.join(current))
+            current = current[-1:] if count_tokens(f"{current[-1]} {sentence}") <= window_tokens else []
+        current.append(sentence)
+    if current:
+        windows.append(' '.join(current))
+    return windows
+
+
+def select_windows(windows, budget):
+    """At most `budget` windows, evenly spread so the start and the end of the account are always kept."""
+    if len(windows) <= budget:
+        return windows
+    positions = np.unique(np.linspace(0, len(windows) - 1, budget).round().astype(int))
+    return [windows[position] for position in positions]
+
+
+@dataclass
+class Narrative:
+    vector: np.ndarray      # pooled query vector, used for the vote and retrieval
+    scores: dict            # category key -> pooled similarity
+    window: str             # the window carrying most weight, used where a model needs text
+    window_vector: np.ndarray   # its embedding, for checks calibrated on single queries such as the gate
+    windows: int            # windows encoded
+
+
+class NarrativeEncoder:
+    """
+    Long-input mode. A long account is split into sentence windows that all
+    fit the encoder, the windows are embedded in one batch, and each window
+    is scored against the category centroids. The window scores are pooled
+    per category:
+
+    - 'max' keeps, for each category, its best window, so one sentence of
+      clear evidence decides however much else surrounds it;
+    - 'attention' weights the windows by softmax(best score / temperature),
+      so windows that look like an incident outweigh context and small talk.
+
+    `max_windows` caps the encoder cost of a single request.
+    """
+
+    def __init__(self, embeddings, category_vectors, keys, pooling='attention', max_tokens=LONG_INPUT_TOKENS,
+                 window_tokens=WINDOW_TOKENS, max_windows=MAX_WINDOWS, temperature=DEFAULT_TEMPERATURE):
+        if pooling not in POOLING:
+            raise ValueError(f"Unknown pooling {pooling!r}; expected one of {POOLING}")
+        self.embeddings = embeddings
+        self.category_vectors = category_vectors
+        self.keys = keys
+        self.pooling = pooling
+        self.max_tokens = max_tokens
+        self.window_tokens = window_tokens
+        self.max_windows = max_windows
+        self.temperature = temperature
+
+    @classmethod
+    def from_vector_store(cls, vector_store, catalog, **settings):
+        keys = [category.key for category in catalog.categories]
+        return cls(vector_store.embedding_function, category_centroids(vector_store, catalog, keys), keys, **settings)
+
+    def is_long(self, text):
+        return count_tokens(text) > self.max_tokens
+
+    def encode(self, text):
+        windows = select_windows(sentence_windows(text, self.window_tokens), self.max_windows)
+        vectors = normalize(self.embeddings.embed_documents(windows))
+        scores = vectors @ self.category_vectors.T                     # (windows, categories)
+        relevance = scores.max(axis=1)
+        if self.pooling == 'max':
+            pooled = scores.max(axis=0)
+            best = int(relevance.argmax())
+            vector = vectors[best]
+        else:
+            weights = np.exp((relevance - relevance.max()) / self.temperature)
+            weights /= weights.sum()
+            pooled = weights @ scores
+            best = int(weights.argmax())
+            # A weighted mean of unit vectors is shorter than one; the index distances, the vote
+            # temperature and the gate thresholds were all calibrated on unit-length queries
+            vector = weights @ vectors
+            vector /= np.linalg.norm(vector)
+        return Narrative(
+            vector=vector,
+            scores={key: float(score) for key, score in zip(self.keys, pooled)},
+            window=windows[best],
+            window_vector=vectors[best],
+            windows=len(windows),
+        )
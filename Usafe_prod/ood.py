@@ -0,0 +1,110 @@
+import sys
+import threading
+import time
+
+import numpy as np
+
+from classifier import category_centroids, normalize
+
+# Inputs that are clearly not incident reports, used to check the gate at calibration time
+OUT_OF_SCOPE_EXAMPLES = (
+    "hello",
+    "hi, how are you?",
+    "test",
+    "what is the weather in Berlin tomorrow?",
+    "recommend a good restaurant near Alexanderplatz",
+    "how do I renew my passport?",
+    "what time does the supermarket close on Sunday?",
+    "write me a poem about the sea",
+    "who won the football match yesterday?",
+    "how much does a monthly BVG ticket cost?",
+    "can you help me with my maths homework?",
+    "thank you, bye",
+)
+
+
+class OutOfScopeGate:
+    """
+    Decides from the query embedding alone whether a submission looks like an
+    incident report at all, before any index search.
+
+    Two signals are used: the cosine similarity to the closest category
+    centroid, and a density estimate over the corpus, namely the Mahalanobis
+    distance of the query under a Gaussian fitted to the chunk vectors in
+    their top principal components. A query is rejected when it is too far
+    from every category or lies in a low-density region. Both thresholds are
+    calibrated when the index is built.
+
+    Every `log_every` seconds (0 disables it) the share of submissions
+    rejected so far is printed to stderr, where operators can watch for a
+    gate that turns away real reports.
+    """
+
+    def __init__(self, vector_store, catalog, min_similarity=None, max_distance=None, components=32, log_every=300):
+        keys = [category.key for category in catalog.categories]
+        self.centroids = category_centroids(vector_store, catalog, keys)
+        self.min_similarity = min_similarity
+        self.max_distance = max_distance
+
+        index = vector_store.index
+        vectors = normalize(index.reconstruct_n(0, index.ntotal))
+        self.mean = vectors.mean(axis=0)
+        centered = vectors - self.mean
+        components = max(1, min(components, len(vectors) - 1))
+        _, singular, basis = np.linalg.svd(centered, full_matrices=False)
+        self.basis = basis[:components]
+        variance = singular[:components] ** 2 / max(len(vectors) - 1, 1)
+        # Regularize so that near-empty directions do not dominate the distance
+        self.inverse_variance = 1.0 / (variance + variance.mean() * 1e-2)
+
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.rejected = 0
+        self.log_every = log_every
+        self._logged = time.monotonic()
+
+    def similarity(self, vectors):
+        """Cosine similarity to the closest category centroid, per query."""
+        return (normalize(vectors) @ self.centroids.T).max(axis=1)
+
+    def distance(self, vectors):
+        """Mahalanobis distance to the corpus in the principal subspace, per query."""
+        projected = (normalize(vectors) - self.mean) @ self.basis.T
+        return np.sqrt((projected ** 2 * self.inverse_variance).sum(axis=1))
+
+    def rejects(self, vectors):
+        """Boolean array: True where a query is out of scope."""
+        vectors = np.asarray(vectors, dtype='float32').reshape(-1, self.centroids.shape[1])
+        rejected = np.zeros(len(vectors), dtype=bool)
+        if self.min_similarity is not None:
+            rejected |= self.similarity(vectors) < self.min_similarity
+        if self.max_distance is not None:
+            rejected |= self.distance(vectors) > self.max_distance
+        return rejected
+
+    def accepts(self, vector):
+        """Check one query vector and count the outcome."""
+        accepted = not self.rejects([vector])[0]
+        with self._lock:
+            self.checked += 1
+            self.rejected += not accepted
+            due = self.log_every and time.monotonic() - self._logged >= self.log_every
+            if due:
+                self._logged = time.monotonic()
+        if due:
+            print(f"Out-of-scope gate rejected {self.rejection_rate:.1%} of {self.checked} submissions", file=sys.stderr)
+        return accepted
+
+    @property
+    def rejection_rate(self):
+        return self.rejected / self.checked if self.checked else 0.0
+
+    def calibrate(self, vectors, coverage=0.99):
+        """
+        Set both thresholds so that `coverage` of the in-scope queries pass:
+        each signal may reject at most half of the remaining share.
+        """
+        tail = (1 - coverage) / 2 * 100
+        self.min_similarity = float(np.percentile(self.similarity(vectors), tail))
+        self.max_distance = float(np.percentile(self.distance(vectors), 100 - tail))
+        return {'min_similarity': self.min_similarity, 'max_distance': self.max_distance}
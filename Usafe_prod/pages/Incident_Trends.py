@@ -0,0 +1,64 @@
+import os
+
+import streamlit as st
+from incident_analytics import (
+    COUNTRY, INCIDENT_TYPE, INCIDENTS_CSV, INCIDENTS_DATASET, MOTIVATION, dataset_readable, load_cube
+)
+
+# Countries compared throughout the EDA notebook
+COUNTRIES_OF_INTEREST = [
+    'France', 'Italy', 'Spain', 'Portugal', 'Germany',
+    'Belgium', 'Austria', 'Switzerland', 'Netherlands', 'Denmark'
+]
+
+
+@st.cache_resource
+def get_incident_cube():
+    """Load the precomputed incident rollup once per server process."""
+    return load_cube()
+
+
+def display_incident_trends():
+    # Page Title
+    st.title("Hate Crime Trends in Europe")
+
+    st.write("""
+    Reported hate crime incidents by country, bias motivation and type of incident.
+    Figures are aggregated from the incident dataset; no individual reports are shown.
+    """)
+
+    # Without the CSV the dataset cannot be rebuilt, so a partial or empty one is as good as none
+    if not (os.path.exists(INCIDENTS_CSV) or dataset_readable(INCIDENTS_DATASET)):
+        st.info("The incident dataset is not available on this server. Place data/hate_crimes.csv and build it "
+                "with `python Usafe_prod/incident_ingest.py`.")
+        return
+
+    cube = get_incident_cube()
+
+    # Filters
+    default_countries = [c for c in COUNTRIES_OF_INTEREST if c in cube.countries]
+    countries = st.multiselect("Countries", cube.countries, default=default_countries)
+    motivations = st.multiselect("Bias motivations", cube.motivations)
+    incident_types = st.multiselect("Types of incident", cube.incident_types)
+    filters = dict(countries=countries, motivations=motivations, incident_types=incident_types)
+
+    # Section 1: Incidents per country
+    st.subheader("🌍 Incidents per Country")
+    st.bar_chart(cube.counts_by(COUNTRY, **filters))
+
+    # Section 2: Most common bias motivation
+    st.subheader("🔍 Most Common Bias Motivation per Country")
+    st.dataframe(cube.most_common_motivation(**filters))
+
+    # Section 3: Trend over time
+    st.subheader("📈 Incidents over Time")
+    yearly = st.toggle("Yearly totals", value=True)
+    st.line_chart(cube.trend(by=MOTIVATION, freq='Y' if yearly else 'M', **filters))
+
+    # Section 4: Bias motivation vs type of incident
+    st.subheader("⚖️ Bias Motivation and Type of Incident")
+    st.dataframe(cube.crosstab(MOTIVATION, INCIDENT_TYPE, **filters))
+
+# Execute the function to display content
+if __name__ == "__main__":
+    display_incident_trends()
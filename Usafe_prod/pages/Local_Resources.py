@@ -1,4 +1,36 @@
 import streamlit as st
+from locations import load_locator
+from resource_catalog import load_catalog, format_resource
+
+
+def display_nearest_resources(catalog):
+    """Closest Berlin organizations and police stations to a postcode or district."""
+    st.subheader("📍 Support Near You in Berlin")
+    locator = load_locator()
+    where = st.text_input("Your postcode or district", placeholder="e.g. 10997 or Neukölln")
+    # Default to the hate crime type detected in the user's conversation, if any
+    conversation = st.session_state.get('conversation')
+    detected = conversation.category if conversation else None
+    keys = [None] + [category.key for category in catalog.categories]
+    labels = {None: "All types"} | {category.key: category.label for category in catalog.categories}
+    category = st.selectbox("Type of hate crime", keys, index=keys.index(detected) if detected in keys else 0,
+                            format_func=labels.get)
+    if not where:
+        return
+    nearest = locator.nearest(where, category, k=3)
+    # The nearest station is listed once, even when it is also among the closest resources
+    shown = {resource.id for resource, _ in nearest}
+    police = [(resource, distance) for resource, distance in locator.nearest(where, type='police', k=1)
+              if resource.id not in shown]
+    if not nearest and not police:
+        if locator.gazetteer.is_berlin_postcode(where):
+            st.info(f"The postcode {where.strip()} is not in our table yet. Please enter your district instead.")
+        else:
+            st.info("We could not find this postcode or district in Berlin.")
+        return
+    lines = [f"{format_resource(resource)} *{resource.address}, {resource.postcode} Berlin – {distance:.1f} km*"
+             for resource, distance in nearest + police]
+    st.markdown("\n".join(lines))
 
 def display_local_resources():
     # Page Title
@@ -9,63 +41,13 @@ def display_local_resources():
     Germany offers numerous resources to support victims of hate crimes. Below, you’ll find information on reporting mechanisms, mental health support, legal aid, and organizations that combat hate speech.
     """)
 
-    # Section 1: Reporting Mechanisms
-    st.subheader("📄 Reporting Mechanisms")
-    st.markdown("""
-    - [Online Strafanzeige](https://www.online-strafanzeige.de): Allows individuals to file criminal complaints online, including hate crimes. Managed by local police authorities with contact details varying by state.
-    - [Meldestelle Respect!](https://www.meldestelle-respect.de): Platform to report hate speech and receive expert analysis.
-    - [Federal Anti-Discrimination Agency](https://www.antidiskriminierungsstelle.de): Provides counseling and support for those facing discrimination, including hate crimes.
-    """)
-
-    # Section 2: Mental Health and Coping Strategies
-    st.subheader("🧠 Mental Health and Coping Strategies")
-    st.markdown("""
-    - [You Are Not Alone](https://www.youarenotalone.ai): Offers tips and resources to help cope with the impact of hate crimes.
-    """)
-
-    # Section 3: Legal Aid and Financial Assistance
-    st.subheader("⚖️ Legal Aid and Financial Assistance")
-    st.markdown("""
-    - [HateAid](https://www.hateaid.org): Provides financial support for legal proceedings related to digital violence and hate crimes.
-    """)
-
-    # Section 4: Organizations Against Hate Speech
-    st.subheader("🛡️ Organizations Against Hate Speech")
-    st.markdown("""
-    - [Kompetenznetzwerk Hass im Netz](https://www.kompetenznetzwerk-hass-im-netz.de): Dedicated to combating hate speech through various initiatives.
-    - [Neue deutsche Medienmacher*innen](https://www.neuemedienmacher.de): Promotes diversity in media to counter hate speech.
-    - [Gesellschaft für Freiheitsrechte – Marie Munk Initiative](https://www.freiheitsrechte.org): Protects democracy by addressing hate speech through legal channels.
-    - [Ich Bin Hier e.V.](https://www.ichbinhier.eu): Empowers individuals to combat online hate speech.
-    """)
+    catalog = load_catalog()
+    display_nearest_resources(catalog)
 
-    # Section 5: Religion-Based Hate Crime Resources
-    st.subheader("✝️ Religion-Based Hate Crime Resources")
-    st.markdown("""
-    - [Get The Trolls Out!](https://www.getthetrollsout.org): Addresses hate speech related to religion through media monitoring and campaigns.
-    """)
-
-    # Section 6: Local Support Resources for Victims in Berlin
-    st.subheader("🏙️ Local Support Resources for Victims in Berlin")
-    st.markdown("""
-    - [Berlin Police – Hate Crime Prevention Unit](https://www.berlin.de): Offers information and support.
-    - [Roots Berlin](https://www.rootsberlin.com): Provides counseling for victims of discrimination.
-    - [KOP – Campaign for Victims of Police Violence](https://www.kop-berlin.de): Supports individuals affected by police violence and hate crimes.
-    - [Verband der Beratungsstellen für Betroffene rechter, rassistischer und antisemitischer Gewalt (VBRG)](https://www.verband-brg.de): Offers counseling, legal assistance, and advocacy.
-    """)
-
-    # Section 7: LGBTQ+ and Minority Support Organizations
-    st.subheader("🏳️‍🌈 LGBTQ+ and Minority Support Organizations")
-    st.markdown("""
-    - [GLADT e.V.](https://www.gladt.de): Supports Black and People of Color (LGBTQ+) in Berlin.
-    - [Hydra e.V.](https://www.hydra-berlin.de): Offers support for sex workers in Berlin facing violence or discrimination.
-    - [LesMigraS](https://www.lesmigras.de): Provides counseling for lesbian, bisexual women, and trans* individuals facing discrimination.
-    """)
-
-    # Section 8: Anti-Discrimination Networks
-    st.subheader("🚫 Anti-Discrimination Networks")
-    st.markdown("""
-    - [Antidiskriminierungsverband Deutschland (advd)](https://www.antidiskriminierung.org): A network of anti-discrimination offices that offers counseling and advocacy.
-    """)
+    # One section per catalog entry, filtered by resource type, category and city
+    for section in catalog.sections:
+        st.subheader(section['title'])
+        st.markdown("\n".join(format_resource(r) for r in catalog.section_resources(section)))
 
 # Execute the function to display content
 if __name__ == "__main__":
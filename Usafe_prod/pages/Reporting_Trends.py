@@ -0,0 +1,75 @@
+import os
+
+import pandas as pd
+import streamlit as st
+from locations import load_gazetteer
+from resource_catalog import load_catalog
+from sentiment import SENTIMENTS
+from trends import NO_CATEGORY, TrendStore
+
+# Counts below this are shown as "<5", so that no cell points at a handful of people
+MIN_SHOWN_COUNT = 5
+
+
+@st.cache_resource
+def get_trend_store(path):
+    return TrendStore(path)
+
+
+def suppress(frame):
+    """Blank out small counts before display."""
+    return frame.astype(object).where(frame >= MIN_SHOWN_COUNT, f"<{MIN_SHOWN_COUNT}")
+
+
+def display_reporting_trends():
+    # Page Title
+    st.title("Usafe Reporting Trends")
+
+    st.write("""
+    Anonymous counts of the submissions Usafe has classified, for NGOs and policymakers.
+    No text is stored: only the detected type of hate crime, the tone of the message,
+    the district when the user chose to give it, and the hour. Counts are estimates.
+    """)
+
+    path = os.getenv('USAFE_TRENDS_DB')
+    if not path or not os.path.exists(path):
+        st.info("Trend counting is not enabled on this server (set USAFE_TRENDS_DB).")
+        return
+
+    sketches = get_trend_store(path).load()
+    catalog = load_catalog()
+    categories = [category.key for category in catalog.categories] + [NO_CATEGORY]
+    labels = {category.key: category.short_label for category in catalog.categories} | {NO_CATEGORY: "No type detected"}
+
+    # Section 1: Totals
+    submissions, reporters = st.columns(2)
+    submissions.metric("Classified submissions", sketches.total)
+    reporters.metric("Distinct conversations (approx.)", sketches.sessions.count())
+
+    # Section 2: Type of hate crime over time
+    st.subheader("📈 Submissions over Time")
+    weekly = st.toggle("Weekly totals", value=False)
+    st.line_chart(sketches.buckets.series('W' if weekly else 'D').rename(columns=labels))
+
+    # Section 3: Tone of the messages per type
+    st.subheader("💬 Tone of the Messages")
+    tone = pd.DataFrame(
+        [[sketches.count(category=category, sentiment=sentiment) for sentiment in SENTIMENTS]
+         for category in categories],
+        index=[labels[category] for category in categories], columns=SENTIMENTS,
+    )
+    st.dataframe(suppress(tone))
+
+    # Section 4: Districts
+    st.subheader("🏙️ Berlin Districts")
+    districts = load_gazetteer().districts
+    by_district = pd.DataFrame(
+        [[sketches.count(category=category, district=district) for category in categories]
+         for district in districts],
+        index=districts, columns=[labels[category] for category in categories],
+    )
+    st.dataframe(suppress(by_district))
+
+# Execute the function to display content
+if __name__ == "__main__":
+    display_reporting_trends()
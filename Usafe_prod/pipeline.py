@@ -0,0 +1,354 @@
+import os
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from langchain_community.vectorstores import FAISS
+from langchain_huggingface import HuggingFaceEmbeddings
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+from assets import load_bundle, resolve_model
+from classifier import DEFAULT_K, DEFAULT_TEMPERATURE, CategoryVoter, MultiLabelClassifier, load_calibration
+from index_store import ReloadablePipeline, current_version, resolve_index, version_path
+from language import SUPPORTED_LANGUAGES, detect_language
+from narrative import LONG_INPUT_TOKENS, MAX_WINDOWS, NarrativeEncoder
+from ood import OutOfScopeGate
+from reranker import CrossEncoderReranker, chunk_id
+from resource_catalog import load_catalog
+from sentiment import analyze_sentiment_vader
+
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+VECTOR_DATABASES_DIR = os.path.join(ROOT_DIR, 'notebooks', 'vector_databases')
+COMBINED_INDEX = os.path.join(VECTOR_DATABASES_DIR, 'usafe_combined')
+EMBEDDING_MODEL = 'sentence-transformers/all-mpnet-base-v2'
+
+# Multilingual mode: one cross-lingual encoder, a shared index and optional per-language indexes
+MULTILINGUAL_EMBEDDING_MODEL = 'sentence-transformers/paraphrase-multilingual-mpnet-base-v2'
+MULTILINGUAL_INDEX = os.path.join(VECTOR_DATABASES_DIR, 'usafe_combined_multilingual')
+
+
+def language_index_path(language, shared_path=MULTILINGUAL_INDEX):
+    """Directory of the index built from definitions written in `language`."""
+    return f"{shared_path}_{language}"
+
+
+def env_flag(name, default=False):
+    """Read a boolean setting from the environment (.env is loaded by the app)."""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_number(name, default, cast=float):
+    """Read a numeric setting from the environment."""
+    value = os.getenv(name)
+    return cast(value) if value not in (None, '') else default
+
+
+def load_embeddings(model_name=EMBEDDING_MODEL):
+    """Load the sentence embedding model, from the asset bundle when one is installed."""
+    return HuggingFaceEmbeddings(model_name=resolve_model(model_name))
+
+
+def load_vector_store(path=COMBINED_INDEX, embeddings=None):
+    """Load the FAISS vector store (the current version, for a versioned index)."""
+    return FAISS.load_local(
+        folder_path=resolve_index(path),
+        embeddings=embeddings or load_embeddings(),
+        allow_dangerous_deserialization=True
+    )
+
+
+@dataclass
+class Classification:
+    category: object = None     # resource_catalog.Category, or None if undetected
+    documents: list = field(default_factory=list)
+    reranked: bool = False
+    probabilities: dict = field(default_factory=dict)
+    mixed: bool = False
+    labels: list = field(default_factory=list)   # every detected Category, best first
+    language: str = None
+    out_of_scope: bool = False
+    degraded: bool = False      # answered by the keyword rules under overload
+    windows: int = 0            # sentence windows encoded in long-input mode
+
+    def __post_init__(self):
+        if not self.labels and self.category is not None:
+            self.labels = [self.category]
+
+
+class UsafePipeline:
+    """
+    The models behind the helpdesk, without any Streamlit code: VADER sentiment,
+    bi-encoder retrieval over the combined definitions index, an optional
+    cross-encoder re-ranking stage, an optional top-k category vote and an
+    optional long-input mode for accounts the encoder would truncate.
+    """
+
+    def __init__(self, vector_store, analyzer=None, reranker=None, voter=None, multilabel=None, catalog=None,
+                 k=4, rerank_candidates=20, gate=None, narrative=None):
+        self.vector_store = vector_store
+        if analyzer is None:
+            load_bundle()   # puts the bundled VADER lexicon on the NLTK path
+            analyzer = SentimentIntensityAnalyzer()
+        self.analyzer = analyzer
+        self.reranker = reranker
+        self.voter = voter
+        self.multilabel = multilabel
+        self.gate = gate
+        self.narrative = narrative
+        self.catalog = catalog or load_catalog()
+        self.k = k
+        self.rerank_candidates = rerank_candidates
+        self._docstore_ids = None
+
+    @classmethod
+    def load(cls, index_path=COMBINED_INDEX, embeddings=None, analyzer=None, vector_store=None, reranker=None):
+        """
+        Build the pipeline from environment settings:
+        USAFE_RERANK, USAFE_RERANK_BUDGET_MS, USAFE_RERANK_CANDIDATES,
+        USAFE_CLASSIFIER ("top1", "vote" or "multilabel"), USAFE_VOTE_K, USAFE_OOD_GATE, USAFE_OOD_LOG_SECONDS,
+        USAFE_LONG_INPUT, USAFE_LONG_INPUT_TOKENS, USAFE_LONG_INPUT_POOLING and
+        USAFE_LONG_INPUT_MAX_WINDOWS.
+        """
+        index_path = resolve_index(index_path)
+        vector_store = vector_store or load_vector_store(index_path, embeddings)
+        catalog = load_catalog()
+        if reranker is None and env_flag('USAFE_RERANK'):
+            reranker = CrossEncoderReranker(budget_ms=env_number('USAFE_RERANK_BUDGET_MS', 150))
+        mode = os.getenv('USAFE_CLASSIFIER', 'top1')
+        calibration = load_calibration(index_path)
+        voter = multilabel = None
+        if mode == 'multilabel':
+            multilabel = MultiLabelClassifier(vector_store, catalog, thresholds=calibration.get('label_thresholds'))
+        elif mode == 'vote':
+            voter = CategoryVoter(
+                vector_store,
+                catalog,
+                temperature=calibration.get('temperature', DEFAULT_TEMPERATURE),
+                k=env_number('USAFE_VOTE_K', DEFAULT_K, int),
+            )
+        gate = None
+        if calibration.get('ood') and env_flag('USAFE_OOD_GATE', True):
+            gate = OutOfScopeGate(vector_store, catalog, log_every=env_number('USAFE_OOD_LOG_SECONDS', 300),
+                                  **calibration['ood'])
+        narrative = None
+        if env_flag('USAFE_LONG_INPUT'):
+            narrative = NarrativeEncoder.from_vector_store(
+                vector_store,
+                catalog,
+                pooling=os.getenv('USAFE_LONG_INPUT_POOLING', 'attention'),
+                max_tokens=env_number('USAFE_LONG_INPUT_TOKENS', LONG_INPUT_TOKENS, int),
+                max_windows=env_number('USAFE_LONG_INPUT_MAX_WINDOWS', MAX_WINDOWS, int),
+                temperature=calibration.get('temperature', DEFAULT_TEMPERATURE),
+            )
+        return cls(
+            vector_store,
+            gate=gate,
+            narrative=narrative,
+            analyzer=analyzer,
+            reranker=reranker,
+            voter=voter,
+            multilabel=multilabel,
+            catalog=catalog,
+            rerank_candidates=env_number('USAFE_RERANK_CANDIDATES', 20, int),
+        )
+
+    def sentiment(self, text):
+        return analyze_sentiment_vader(self.analyzer, text)
+
+    def retrieve(self, text, k=None, vector=None):
+        """Return the k nearest definition chunks to the text (or its precomputed vector)."""
+        if vector is not None:
+            return self.vector_store.similarity_search_by_vector(vector, k=k or self.k)
+        return self.vector_store.similarity_search(text, k=k or self.k)
+
+    def classify(self, text):
+        """
+        Detect the hate crime category from the source PDF of the best-matching chunk.
+        The query is embedded once; with an out-of-scope gate, input that does
+        not look like an incident is rejected before any search.
+        With a re-ranker, a wider candidate set is retrieved and re-scored within
+        the latency budget; if the stage is skipped the bi-encoder order is kept.
+        With a voter, the category is decided from the top-k distances instead;
+        with a multi-label classifier, every category above its threshold is kept.
+        A long account is encoded as pooled sentence windows (see narrative.py);
+        the gate checks and the re-ranker reads its most relevant window.
+        """
+        started = time.perf_counter()
+        narrative = None
+        if self.narrative is not None and self.narrative.is_long(text):
+            narrative = self.narrative.encode(text)
+            vector, query, windows = narrative.vector, narrative.window, narrative.windows
+            # The gate's thresholds were calibrated on single-query embeddings, not on pooled ones
+            gate_vector = narrative.window_vector
+        else:
+            vector, query, windows = self.vector_store.embedding_function.embed_query(text), text, 0
+            gate_vector = vector
+        if self.gate is not None and not self.gate.accepts(gate_vector):
+            return Classification(out_of_scope=True, windows=windows)
+
+        if self.multilabel is not None:
+            if narrative is not None:
+                # Threshold the pooled window scores rather than the score of the pooled vector
+                scores = narrative.scores
+                keys = self.multilabel.labels(np.array([scores[key] for key in self.multilabel.keys]))
+            else:
+                keys, scores = self.multilabel.classify_vectors([vector])[0]
+            labels = [self.catalog.category(key) for key in keys]
+            return Classification(
+                category=labels[0] if labels else None,
+                probabilities=scores,
+                labels=labels,
+                windows=windows,
+            )
+
+        if self.voter is not None:
+            vote = self.voter.classify_vectors([vector])[0]
+            return Classification(
+                category=self.catalog.category(vote.category),
+                probabilities=vote.probabilities,
+                mixed=vote.mixed,
+                windows=windows,
+            )
+
+        if self.reranker is None:
+            documents = self.retrieve(query, vector=vector)
+            reranked = False
+        else:
+            candidates = self.retrieve(query, k=self.rerank_candidates, vector=vector)
+            ordered = self.reranker.rerank(query, candidates, started=started)
+            reranked = ordered is not None
+            documents = (ordered or candidates)[:self.k]
+
+        category = None
+        if documents:
+            category = self.catalog.category(documents[0].metadata.get('source'))
+        return Classification(category=category, documents=documents, reranked=reranked, windows=windows)
+
+    def chunk_ids(self, documents):
+        """Docstore ids of retrieved chunks, so they can be fetched again without a search."""
+        if self._docstore_ids is None:
+            docstore = self.vector_store.docstore
+            self._docstore_ids = {
+                chunk_id(docstore.search(doc_id)): doc_id
+                for doc_id in self.vector_store.index_to_docstore_id.values()
+            }
+        ids = (getattr(document, 'id', None) or self._docstore_ids.get(chunk_id(document)) for document in documents)
+        return [doc_id for doc_id in ids if doc_id is not None]
+
+    def documents(self, ids):
+        """Fetch chunks by docstore id; unknown ids are skipped."""
+        found = (self.vector_store.docstore.search(doc_id) for doc_id in ids)
+        return [document for document in found if not isinstance(document, str)]
+
+    def classify_turn(self, conversation, text):
+        """
+        Classify a user turn of a conversation.Conversation. The outcome is stored
+        in the conversation, and classifying the same description again (a
+        Streamlit rerun or a follow-up) rebuilds it from the stored chunk ids
+        instead of searching the index.
+        """
+        if conversation.query == text:
+            labels = [self.catalog.category(key) for key in conversation.categories]
+            return Classification(
+                category=labels[0] if labels else None,
+                documents=self.documents(conversation.chunk_ids),
+                mixed=conversation.mixed,
+                labels=labels,
+            )
+        classification = self.classify(text)
+        if classification.out_of_scope:
+            conversation.stage = 'fallback'
+        conversation.remember(
+            text,
+            [category.key for category in classification.labels],
+            self.chunk_ids(classification.documents),
+            mixed=classification.mixed,
+        )
+        return classification
+
+
+class MultilingualPipeline:
+    """
+    Routes each query to the index for its detected language, falling back to
+    the shared cross-lingual index. All indexes share one multilingual encoder,
+    so no query is translated and every language costs one embedding.
+    """
+
+    def __init__(self, pipelines, shared):
+        self.pipelines = pipelines     # language code -> UsafePipeline
+        self.shared = shared
+
+    @classmethod
+    def load(cls, index_path=MULTILINGUAL_INDEX, model_name=MULTILINGUAL_EMBEDDING_MODEL):
+        embeddings = load_embeddings(model_name)
+        shared = load_watched(index_path, embeddings)
+        pipelines = {}
+        for language in SUPPORTED_LANGUAGES:
+            path = language_index_path(language, index_path)
+            if os.path.isdir(path):
+                pipelines[language] = load_watched(path, embeddings, analyzer=shared.analyzer)
+        return cls(pipelines, shared)
+
+    @property
+    def reloads(self):
+        """New index versions swapped in, over the shared and every language index."""
+        return sum(getattr(pipeline, 'reloads', 0) for pipeline in [self.shared, *self.pipelines.values()])
+
+    def for_language(self, text):
+        language = detect_language(text)
+        return language, self.pipelines.get(language, self.shared)
+
+    def classify(self, text):
+        language, pipeline = self.for_language(text)
+        classification = pipeline.classify(text)
+        classification.language = language
+        return classification
+
+    def classify_turn(self, conversation, text):
+        language, pipeline = self.for_language(text)
+        classification = pipeline.classify_turn(conversation, text)
+        classification.language = language
+        return classification
+
+    def __getattr__(self, name):
+        # Sentiment and everything else is served by the shared pipeline
+        return getattr(self.shared, name)
+
+
+def reload_pipeline(index_path, current):
+    """Load a new index version behind the models `current` already has loaded."""
+    return UsafePipeline.load(
+        index_path,
+        embeddings=current.vector_store.embedding_function,
+        analyzer=current.analyzer,
+        reranker=current.reranker,
+    )
+
+
+def watch_index(usafe, version, root=COMBINED_INDEX):
+    """Serve `usafe`, loaded from `version` of the index at `root`, and hot-swap newer versions."""
+    return ReloadablePipeline(root, usafe, version, reload_pipeline,
+                              interval=env_number('USAFE_INDEX_POLL_SECONDS', 30))
+
+
+def load_watched(root, embeddings=None, analyzer=None):
+    """Load the index at `root`; a versioned one is watched and hot-swapped like the English index."""
+    version = current_version(root)
+    if version is None:
+        return UsafePipeline.load(root, embeddings, analyzer)
+    return watch_index(UsafePipeline.load(version_path(root, version), embeddings, analyzer), version, root)
+
+
+def create_pipeline():
+    """
+    Load the pipeline selected by the environment: the English index by default,
+    or the multilingual indexes when USAFE_MULTILINGUAL is set. Every versioned
+    index is watched and hot-swapped every USAFE_INDEX_POLL_SECONDS.
+    """
+    if env_flag('USAFE_MULTILINGUAL'):
+        return MultilingualPipeline.load()
+    return load_watched(COMBINED_INDEX)
@@ -0,0 +1,346 @@
+import argparse
+import gc
+import os
+import signal
+import sys
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Usafe.py')
+MB = 2 ** 20
+# How long a replacement worker may take to answer its health check, and an old one to drain
+STARTUP_TIMEOUT = 120
+DRAIN_TIMEOUT = 600
+
+# Set in the parent before forking; every worker inherits it copy-on-write
+_preloaded = None
+
+
+def preloaded_pipeline():
+    """The pipeline loaded by the pre-fork parent, or None when the app was started on its own."""
+    return _preloaded
+
+
+def preload(freeze=True):
+    """
+    Load every read-only asset of the pipeline (torch, encoder weights, FAISS
+    index, docstore, catalog, prompts) in this process. With `freeze`, the
+    collector moves all surviving objects to a permanent generation, so
+    collections in the workers never write to the pages holding them.
+    """
+    global _preloaded
+    # Tokenizer threads started before a fork deadlock in the child
+    os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+    from pipeline import create_pipeline
+    from prompts import load_prompts
+    from danger import load_danger_matcher
+    from locations import load_locator
+
+    _preloaded = create_pipeline()
+    load_prompts()
+    load_danger_matcher()
+    load_locator()
+    gc.collect()
+    if freeze:
+        gc.freeze()
+    return _preloaded
+
+
+def smaps_rollup(pid):
+    """Memory counters of a process from /proc/<pid>/smaps_rollup, in bytes."""
+    counters = {}
+    with open(f'/proc/{pid}/smaps_rollup') as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                counters[parts[0].rstrip(':')] = int(parts[1]) * 1024
+    return counters
+
+
+@dataclass
+class MemoryShare:
+    pid: int
+    rss: int
+    pss: int        # proportional share: shared pages split between the processes mapping them
+    shared: int
+    private: int
+
+    @classmethod
+    def of(cls, pid):
+        counters = smaps_rollup(pid)
+        return cls(
+            pid=pid,
+            rss=counters.get('Rss', 0),
+            pss=counters.get('Pss', 0),
+            shared=counters.get('Shared_Clean', 0) + counters.get('Shared_Dirty', 0),
+            private=counters.get('Private_Clean', 0) + counters.get('Private_Dirty', 0),
+        )
+
+
+def share_report(parent, workers):
+    """Shared vs private memory of the parent and each worker, and the total actually used."""
+    rows = [('parent', MemoryShare.of(parent))] + [(f'worker {i}', MemoryShare.of(pid)) for i, pid in enumerate(workers)]
+    lines = [f"{'process':<12}{'pid':>8}{'RSS MB':>10}{'shared MB':>11}{'private MB':>12}{'PSS MB':>10}"]
+    for name, share in rows:
+        lines.append(f"{name:<12}{share.pid:>8}{share.rss / MB:>10.1f}{share.shared / MB:>11.1f}"
+                     f"{share.private / MB:>12.1f}{share.pss / MB:>10.1f}")
+    rss = sum(share.rss for _, share in rows)
+    pss = sum(share.pss for _, share in rows)
+    lines.append(f"total: {pss / MB:.1f} MB used (PSS), {rss / MB:.1f} MB if nothing were shared")
+    return "\n".join(lines)
+
+
+def _index_reloads():
+    """How many new index versions the preloaded pipeline has swapped in (0 when it is not versioned)."""
+    return getattr(_preloaded, 'reloads', 0)
+
+
+def _limit_threads(threads):
+    """Split the cores between workers instead of each torch pool claiming all of them."""
+    if threads and 'torch' in sys.modules:
+        sys.modules['torch'].set_num_threads(threads)
+
+
+def _active_sessions():
+    """Browser sessions connected to this worker's Streamlit server, or None if it cannot tell."""
+    try:
+        from streamlit.runtime import Runtime
+        return Runtime.instance()._session_mgr.num_active_sessions()
+    except Exception:
+        return None
+
+
+def _drain(timeout):
+    """Stop this worker once its last session has disconnected, or after `timeout` seconds."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        active = _active_sessions()
+        if active == 0:
+            break
+        time.sleep(1)
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+def _run_streamlit(port, drain_timeout=DRAIN_TIMEOUT):
+    from streamlit.web import bootstrap
+
+    # SIGUSR1 from the parent: a replacement is serving, finish the sessions still open here, then exit
+    signal.signal(signal.SIGUSR1, lambda signum, frame: threading.Thread(
+        target=_drain, args=(drain_timeout,), name='drain', daemon=True).start())
+    options = {'server.port': port, 'server.headless': True}
+    bootstrap.load_config_options(flag_options=options)
+    bootstrap.run(APP_PATH, False, [], options)
+
+
+def _healthy(port):
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+
+def _fork(target, *args, threads=None):
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            _limit_threads(threads)
+            target(*args)
+        except BaseException as exc:
+            print(f"Worker {os.getpid()} failed: {exc!r}", file=sys.stderr)
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def _stop(workers):
+    for pid in workers:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in workers:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+
+
+class RollingRestart:
+    """
+    Replaces the workers with fresh forks of the parent, one at a time and
+    without dropping a session: the replacement starts on the spare port,
+    and only once it answers its health check is the old worker told to
+    drain. The old worker exits when its last session has disconnected, and
+    its port becomes the spare for the next replacement.
+    """
+
+    def __init__(self, old_workers, spare_port, draining=None):
+        self.queue = list(old_workers)
+        self.spare_port = spare_port   # free only while nothing is draining
+        self.starting = None           # (replacement pid, started at)
+        self.draining = dict(draining or {})   # old worker pid -> its port
+
+    @property
+    def done(self):
+        return not self.queue and self.starting is None and not self.draining
+
+    def step(self, ports, threads):
+        """Advance the restart; `ports` maps the serving workers' pids to their ports."""
+        if self.starting is None and self.queue and not self.draining:
+            self.queue = [pid for pid in self.queue if pid in ports]
+            if self.queue:
+                self.starting = (_fork(_run_streamlit, self.spare_port, threads=threads), time.monotonic())
+        elif self.starting is not None:
+            pid, started = self.starting
+            if _healthy(self.spare_port):
+                old = self.queue.pop(0)
+                ports[pid] = self.spare_port
+                self.draining[old] = ports.pop(old)
+                os.kill(old, signal.SIGUSR1)
+                self.starting = None
+            elif time.monotonic() - started > STARTUP_TIMEOUT:
+                print(f"Replacement worker {pid} did not start; keeping the old workers", file=sys.stderr)
+                self.abort()
+
+    def exited(self, pid):
+        """Handle an exited child that belongs to the restart; False if it is not one of ours."""
+        if pid in self.draining:
+            self.spare_port = self.draining.pop(pid)
+            return True
+        if self.starting is not None and pid == self.starting[0]:
+            print(f"Replacement worker {pid} exited before serving; keeping the old workers", file=sys.stderr)
+            self.starting = None
+            self.queue = []
+            return True
+        return False
+
+    def abort(self):
+        if self.starting is not None:
+            _stop([self.starting[0]])
+            self.starting = None
+        self.queue = []
+
+    def pids(self):
+        return list(self.draining) + ([self.starting[0]] if self.starting else [])
+
+
+def serve(workers=2, port=8501, threads=None, report_every=0, freeze=True):
+    """
+    Fork one Streamlit server per worker on consecutive ports, starting at
+    `port`, behind a load balancer with sticky sessions. Dead workers are
+    forked again from the loaded parent, so a restart costs no model loading.
+
+    Only the parent watches a versioned index. When it has loaded a new
+    version, the workers are replaced by a RollingRestart through the spare
+    port `port + workers`, so they all share the single copy of the new index.
+    """
+    ports = {}
+    for i in range(workers):
+        ports[_fork(_run_streamlit, port + i, threads=threads)] = port + i
+    spare_port = port + workers
+    print(f"{workers} workers on ports {port}-{port + workers - 1}, port {spare_port} spare for restarts",
+          file=sys.stderr)
+    restart = None
+
+    def shutdown(signum, frame):
+        _stop(list(ports) + (restart.pids() if restart else []))
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    last_report = time.monotonic()
+    reloads = _index_reloads()
+    while True:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid in ports:
+            worker_port = ports.pop(pid)
+            print(f"Worker {pid} on port {worker_port} exited ({status}); restarting", file=sys.stderr)
+            ports[_fork(_run_streamlit, worker_port, threads=threads)] = worker_port
+        elif pid and restart is not None:
+            restart.exited(pid)
+        if _index_reloads() != reloads:
+            reloads = _index_reloads()
+            gc.collect()
+            if freeze:
+                gc.freeze()
+            print(f"Index version {getattr(_preloaded, 'version', '(new)')} loaded; replacing the workers one at a time", file=sys.stderr)
+            draining = {}
+            if restart is not None:
+                # Workers already replaced have the previous version too; replace them all again
+                restart.abort()
+                spare_port, draining = restart.spare_port, restart.draining
+            restart = RollingRestart(list(ports), spare_port, draining)
+        if restart is not None:
+            restart.step(ports, threads)
+            if restart.done:
+                spare_port, restart = restart.spare_port, None
+        if report_every and time.monotonic() - last_report >= report_every:
+            print(share_report(os.getpid(), list(ports)), file=sys.stderr)
+            last_report = time.monotonic()
+        time.sleep(1)
+
+
+def _measure_worker(requests, ready):
+    from loadtest import make_submissions
+
+    submissions = make_submissions()
+    for i in range(requests):
+        text = submissions[i % len(submissions)]
+        _preloaded.sentiment(text)
+        _preloaded.classify(text)
+    os.write(ready, b'.')
+    signal.pause()
+
+
+def measure(workers=2, requests=200, threads=None):
+    """
+    Fork `workers` processes that each serve `requests` classifications from
+    the shared pipeline, then report how much of their memory stayed shared.
+    """
+    read, write = os.pipe()
+    pids = [_fork(_measure_worker, requests, write, threads=threads) for _ in range(workers)]
+    received = 0
+    while received < workers:
+        received += len(os.read(read, workers))
+    try:
+        return share_report(os.getpid(), pids)
+    finally:
+        _stop(pids)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load the Usafe models once, then fork workers that share them copy-on-write.")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--port', type=int, default=8501, help="Port of the first worker; the others follow")
+    parser.add_argument('--no-gc-freeze', action='store_true', help="Leave the loaded objects to the collector")
+    parser.add_argument('--torch-threads', type=int, default=None,
+                        help="Threads per worker (default: cores divided by workers)")
+    parser.add_argument('--report-every', type=float, default=0,
+                        help="Print shared vs private memory per worker every N seconds")
+    parser.add_argument('--measure', action='store_true',
+                        help="Serve synthetic requests in each worker, print the memory report and exit")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per worker with --measure")
+    args = parser.parse_args()
+
+    threads = args.torch_threads or max(1, (os.cpu_count() or 1) // args.workers)
+    started = time.perf_counter()
+    preload(freeze=not args.no_gc_freeze)
+    print(f"Assets loaded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    if args.measure:
+        print(measure(args.workers, args.requests, threads))
+    else:
+        serve(args.workers, args.port, threads, args.report_every, freeze=not args.no_gc_freeze)
+
+
+if __name__ == "__main__":
+    # Run through the importable module, so the app's `from prefork import ...` sees the preloaded pipeline
+    from prefork import main as prefork_main
+    prefork_main()
@@ -0,0 +1,102 @@
+import json
+import os
+import string
+from functools import lru_cache
+
+from resource_catalog import DATA_DIR, format_laws, format_resource, load_catalog
+
+PROMPTS_PATH = os.path.join(DATA_DIR, 'prompts.json')
+
+_formatter = string.Formatter()
+
+
+class CompiledPrompt:
+    """
+    A template split once into literal text and slot names. Filling it is a
+    single join over a precomputed list instead of parsing the template again.
+    """
+
+    def __init__(self, template, static=None):
+        static = static or {}
+        parts, slots = [], []
+        literal = ''
+        for text, name, spec, conversion in _formatter.parse(template):
+            literal += text
+            if name is None:
+                continue
+            if name in static:
+                literal += _formatter.format_field(_formatter.convert_field(static[name], conversion), spec or '')
+            else:
+                parts.append(literal)
+                slots.append(name)
+                literal = ''
+        parts.append(literal)
+        self.parts = tuple(parts)
+        self.slots = tuple(slots)
+
+    def render(self, **values):
+        missing = [slot for slot in self.slots if slot not in values]
+        if missing:
+            raise KeyError(f"Missing prompt values: {', '.join(missing)}")
+        pieces = [self.parts[0]]
+        for slot, part in zip(self.slots, self.parts[1:]):
+            pieces.append(str(values[slot]))
+            pieces.append(part)
+        return ''.join(pieces)
+
+
+def category_values(catalog, category):
+    """Static slot values of a category, all taken from the resource catalog."""
+    laws = catalog.find(category.key, type='law')
+    resources = [r for r in catalog.for_incident(category.key) if r.type != 'law']
+    return {
+        'crime_type': category.label,
+        'law_definitions': format_laws(laws),
+        'supportive_resources': "\n".join(format_resource(resource) for resource in resources),
+    }
+
+
+class PromptRenderer:
+    """
+    The response templates of the multi-step flow (data/prompts.json), compiled
+    at startup once per category with everything that only depends on the
+    category already filled in. At request time only the dynamic slots, such as
+    retrieved definitions, remain.
+    """
+
+    def __init__(self, data, catalog=None, data_dir=DATA_DIR):
+        catalog = catalog or load_catalog()
+        self.version = data['version']
+        self.guide = None
+        if data.get('guide'):
+            with open(os.path.join(data_dir, data['guide']), encoding='utf-8') as file:
+                self.guide = file.read()
+
+        self._generic = {name: CompiledPrompt(text) for name, text in data['templates'].items()}
+        self._compiled = {}
+        for category in catalog.categories:
+            values = category_values(catalog, category)
+            for name, text in data['templates'].items():
+                self._compiled[name, category.key] = CompiledPrompt(text, values)
+
+    @property
+    def names(self):
+        return tuple(self._generic)
+
+    def compiled(self, name, category=None):
+        """The compiled template for a category key (or the generic one)."""
+        return self._compiled.get((name, category)) or self._generic[name]
+
+    def slots(self, name, category=None):
+        """Slots that still have to be filled per request."""
+        return self.compiled(name, category).slots
+
+    def render(self, name, category=None, **values):
+        return self.compiled(name, category).render(**values)
+
+
+@lru_cache(maxsize=None)
+def load_prompts(path=PROMPTS_PATH):
+    """Load and compile the prompt templates (cached per path)."""
+    with open(path, encoding='utf-8') as file:
+        return PromptRenderer(json.load(file), data_dir=os.path.dirname(path))
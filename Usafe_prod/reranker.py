@@ -0,0 +1,111 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from sentence_transformers import CrossEncoder
+
+from assets import resolve_model
+
+RERANK_MODEL = 'cross-encoder/ms-marco-MiniLM-L-6-v2'
+
+
+def chunk_id(document):
+    """Stable id of a retrieved chunk: its docstore id, or a hash of its text."""
+    if getattr(document, 'id', None):
+        return document.id
+    return hashlib.sha1(document.page_content.encode('utf-8')).hexdigest()
+
+
+class CrossEncoderReranker:
+    """
+    Second-stage scoring of retrieved chunks with a small CPU cross-encoder.
+
+    Scores are cached per (query, chunk) pair. The time per uncached pair is
+    tracked as a moving average, and only as many pairs as fit in the remaining
+    latency budget are scored; when none fit, the stage is skipped.
+    """
+
+    def __init__(self, model_name=RERANK_MODEL, budget_ms=150, cache_size=4096, min_candidates=2):
+        self.model = CrossEncoder(resolve_model(model_name), device='cpu')
+        self.budget = budget_ms / 1000
+        self.min_candidates = min_candidates
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        # Seconds per scored pair, refined after every call
+        self._pair_cost = None
+        self.skipped = 0
+        self.reranked = 0
+        self._calibrate()
+
+    def _calibrate(self, pairs=8):
+        """Estimate the per-pair cost up front so the first request is budgeted too."""
+        sample = [("calibration query", "calibration passage " * 40)] * pairs
+        self.model.predict(sample[:1])
+        started = time.perf_counter()
+        self.model.predict(sample)
+        self._pair_cost = (time.perf_counter() - started) / pairs
+
+    def _cached(self, key):
+        with self._lock:
+            score = self._cache.get(key)
+            if score is not None:
+                self._cache.move_to_end(key)
+            return score
+
+    def _store(self, scores, cost):
+        """Cache new scores and fold the measured per-pair `cost` into the moving average."""
+        with self._lock:
+            self._cache.update(scores)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            self._pair_cost = cost if self._pair_cost is None else 0.8 * self._pair_cost + 0.2 * cost
+
+    def _affordable(self, remaining):
+        """Number of uncached pairs that can be scored in `remaining` seconds."""
+        with self._lock:
+            pair_cost = self._pair_cost
+        if pair_cost is None:
+            return None
+        return int(remaining / pair_cost)
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def rerank(self, query, documents, started=None):
+        """
+        Return `documents` ordered by cross-encoder score, or None if the stage
+        was skipped because the budget (counted from `started`) is exhausted.
+        Candidates that could not be scored in time keep their retrieval order
+        after the scored ones.
+        """
+        started = started if started is not None else time.perf_counter()
+        remaining = self.budget - (time.perf_counter() - started)
+
+        keys = [(query, chunk_id(document)) for document in documents]
+        scores = {key: self._cached(key) for key in keys}
+        missing = [i for i, key in enumerate(keys) if scores[key] is None]
+
+        affordable = self._affordable(remaining)
+        if missing and affordable is not None:
+            if affordable < min(self.min_candidates, len(missing)):
+                self._count('skipped')
+                return None
+            missing = missing[:affordable]
+
+        if missing:
+            scoring_started = time.perf_counter()
+            pairs = [(query, documents[i].page_content) for i in missing]
+            predicted = self.model.predict(pairs, convert_to_numpy=True)
+            elapsed = time.perf_counter() - scoring_started
+            new_scores = {keys[i]: float(score) for i, score in zip(missing, predicted)}
+            scores.update(new_scores)
+            self._store(new_scores, elapsed / len(missing))
+
+        scored = [i for i, key in enumerate(keys) if scores[key] is not None]
+        unscored = [i for i, key in enumerate(keys) if scores[key] is None]
+        scored.sort(key=lambda i: scores[keys[i]], reverse=True)
+        self._count('reranked')
+        return [documents[i] for i in scored + unscored]
@@ -0,0 +1,199 @@
+import json
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+CATALOG_PATH = os.path.join(DATA_DIR, 'resources.json')
+
+# Category key for resources that apply to every type of hate crime
+GENERAL = 'general'
+# City value for resources that are available everywhere in Germany
+NATIONWIDE = 'nationwide'
+
+
+@dataclass(frozen=True)
+class Resource:
+    id: str
+    name: str
+    type: str
+    categories: tuple
+    city: str
+    languages: tuple
+    description: str
+    url: str = None
+    code: str = None
+    short_name: str = None
+    address: str = None
+    postcode: str = None
+
+
+@dataclass(frozen=True)
+class Category:
+    key: str
+    label: str
+    short_label: str
+    source: str
+    essentials: tuple
+
+
+class ResourceCatalog:
+    """
+    In-memory view of data/resources.json.
+
+    Every resource is indexed under each (category, city, type) combination it
+    matches, with None standing for "any", so lookups are a single dict access.
+    """
+
+    def __init__(self, data):
+        self.version = data.get('version', 1)
+        self.sections = tuple(data.get('sections', ()))
+        self.categories = tuple(
+            Category(
+                key=c['key'],
+                label=c['label'],
+                short_label=c.get('short_label', c['label']),
+                source=c['source'],
+                essentials=tuple(c.get('essentials', ())),
+            )
+            for c in data['categories']
+        )
+        self.resources = tuple(
+            Resource(
+                id=r['id'],
+                name=r['name'],
+                type=r['type'],
+                categories=tuple(r.get('categories', (GENERAL,))),
+                city=r.get('city', NATIONWIDE),
+                languages=tuple(r.get('languages', ())),
+                description=r.get('description', ''),
+                url=r.get('url'),
+                code=r.get('code'),
+                short_name=r.get('short_name'),
+                address=r.get('address'),
+                postcode=r.get('postcode'),
+            )
+            for r in data['resources']
+        )
+
+        self._by_id = {r.id: r for r in self.resources}
+        # Categories can be looked up by key, display label or source PDF name
+        self._categories = {}
+        for category in self.categories:
+            for alias in (category.key, category.label, category.source):
+                self._categories[alias.lower()] = category
+
+        self._index = {}
+        for resource in self.resources:
+            for category in resource.categories + (None,):
+                for city in (resource.city, None):
+                    for type_ in (resource.type, None):
+                        key = (category, city, type_)
+                        self._index.setdefault(key, []).append(resource)
+        self._index = {key: tuple(value) for key, value in self._index.items()}
+
+    def get(self, resource_id):
+        """Return a resource by its id, or None."""
+        return self._by_id.get(resource_id)
+
+    def category(self, name):
+        """Resolve a category key, label or source PDF name to a Category."""
+        if name is None:
+            return None
+        return self._categories.get(os.path.basename(name).lower())
+
+    def find(self, category=None, city=None, type=None, language=None):
+        """
+        Return the resources matching every given filter, in catalog order.
+        """
+        if category is not None and category != GENERAL:
+            resolved = self.category(category)
+            category = resolved.key if resolved else category
+        results = self._index.get((category, city, type), ())
+        if language:
+            results = tuple(r for r in results if language in r.languages)
+        return results
+
+    def for_incident(self, category, city='Berlin', type=None, language=None):
+        """
+        Return the resources relevant to a detected hate crime type in a city:
+        category-specific entries first, then general ones, local before nationwide.
+        """
+        results = []
+        seen = set()
+        for cat in (category, GENERAL):
+            for place in (city, NATIONWIDE):
+                for resource in self.find(cat, place, type, language):
+                    if resource.id not in seen:
+                        seen.add(resource.id)
+                        results.append(resource)
+        return results
+
+    def essentials(self, category):
+        """
+        Return the (role, markdown) pairs for the "Top 3 Essential Steps" of a category.
+        """
+        resolved = self.category(category)
+        if resolved is None:
+            return []
+        steps = []
+        for step in resolved.essentials:
+            resource = self.get(step.get('resource'))
+            name = f"**{resource.short_name or resource.name}**" if resource else ''
+            steps.append((step['role'], step['text'].format(name=name)))
+        return steps
+
+    def merged_essentials(self, categories):
+        """
+        Essential steps for several detected categories, in category order,
+        without repeating a step that two categories share.
+        """
+        steps = []
+        for category in categories:
+            for step in self.essentials(category):
+                if step not in steps:
+                    steps.append(step)
+        return steps
+
+    def section_resources(self, section):
+        """Return the resources listed under one of the catalog's page sections."""
+        return self.find(section.get('category'), section.get('city'), section.get('type'))
+
+
+def format_resource(resource):
+    """Render a resource as a markdown list item."""
+    name = f"[{resource.name}]({resource.url})" if resource.url else f"**{resource.name}**"
+    return f"- {name}: {resource.description}"
+
+
+def format_laws(laws):
+    """
+    Render law resources as a markdown list, nesting provisions under their code.
+    """
+    lines = []
+    codes = {}
+    for law in laws:
+        if law.code:
+            if law.code not in codes:
+                codes[law.code] = []
+                lines.append(law.code)
+            codes[law.code].append(law)
+        else:
+            lines.append(law)
+
+    markdown = []
+    for entry in lines:
+        if isinstance(entry, str):
+            markdown.append(f"- **{entry}**:")
+            for law in codes[entry]:
+                markdown.append(f"    - **{law.name}**: {law.description}")
+        else:
+            markdown.append(f"- **{entry.name}**: {entry.description}")
+    return "\n".join(markdown)
+
+
+@lru_cache(maxsize=None)
+def load_catalog(path=CATALOG_PATH):
+    """Load and index the resource catalog (cached per path)."""
+    with open(path, encoding='utf-8') as file:
+        return ResourceCatalog(json.load(file))
@@ -0,0 +1,16 @@
+# The only values analyze_sentiment_vader returns, also the tone columns of the Reporting Trends page
+NEGATIVE, NEUTRAL = SENTIMENTS = ('negative', 'neutral')
+
+
+def analyze_sentiment_vader(analyzer, user_input):
+    """Classify sentiment as either negative or neutral using VADER."""
+    sentiment_scores = analyzer.polarity_scores(user_input)
+    compound_score = sentiment_scores['compound']
+    negative_score = sentiment_scores['neg']
+
+    # Enhanced classification logic:
+    # - Classify as "negative" if the compound score is below -0.2 or the negative score is above 0.3
+    if compound_score <= -0.2 or negative_score > 0.3:
+        return NEGATIVE
+    else:
+        return NEUTRAL
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+import time
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from resource_catalog import load_catalog
+
+# The only fields of a classification that are aggregated; the text is never seen here
+FIELDS = ('category', 'sentiment', 'district')
+# Every non-empty combination of fields is counted, so any filter is one lookup
+COMBINATIONS = tuple(fields for size in range(1, len(FIELDS) + 1) for fields in combinations(FIELDS, size))
+NO_CATEGORY = 'none'
+UNKNOWN = 'unknown'
+HOUR = 3600
+
+
+def _hash(value):
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class CountMinSketch:
+    """
+    Approximate counts for an open set of keys in a fixed `depth` x `width`
+    table. Estimates never undercount, and overcount by at most
+    e/width of the total with probability 1 - exp(-depth).
+    """
+
+    def __init__(self, width=2048, depth=4, table=None):
+        self.table = table if table is not None else np.zeros((depth, width), dtype=np.uint32)
+        self._flat = memoryview(self.table.reshape(-1))     # fast scalar access; updates land in `table`
+
+    def _cells(self, key):
+        """Flat table index of `key` in each row (double hashing)."""
+        depth, width = self.table.shape
+        digest = _hash(key)
+        first, step = digest & 0xFFFFFFFF, (digest >> 32) | 1
+        return [row * width + (first + row * step) % width for row in range(depth)]
+
+    def add(self, key, count=1):
+        cells = self._flat
+        for cell in self._cells(key):
+            cells[cell] += count
+
+    def estimate(self, key):
+        return int(min(self._flat[cell] for cell in self._cells(key)))
+
+    def merge(self, other):
+        self.table += other.table
+
+
+class HyperLogLog:
+    """Approximate number of distinct items in 2**precision one-byte registers (~1.6% error at 12)."""
+
+    def __init__(self, precision=12, registers=None):
+        self.precision = precision
+        self.registers = registers if registers is not None else np.zeros(1 << precision, dtype=np.uint8)
+        self._registers = memoryview(self.registers)
+
+    def add(self, item):
+        value = _hash(item)
+        index = value >> (64 - self.precision)
+        rest = value & ((1 << (64 - self.precision)) - 1)
+        rank = 64 - self.precision - rest.bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def count(self):
+        size = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        estimate = alpha * size * size / np.sum(np.exp2(-self.registers.astype(float)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * size and zeros:
+            estimate = size * math.log(size / zeros)       # small-range correction
+        return int(round(estimate))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+
+class TimeBuckets:
+    """
+    Hourly counts per column in a ring of `hours` slots; a slot is cleared when
+    the ring comes round to it again, so memory does not grow with time.
+    """
+
+    def __init__(self, columns, hours=90 * 24, counts=None, slots=None):
+        self.columns = tuple(columns)
+        self._column = {column: i for i, column in enumerate(self.columns)}
+        self.counts = counts if counts is not None else np.zeros((hours, len(self.columns)), dtype=np.uint32)
+        self.slots = slots if slots is not None else np.zeros(hours, dtype=np.int64)    # hour held by each slot
+
+    def add(self, column, timestamp, count=1):
+        hour = int(timestamp // HOUR)
+        slot = hour % len(self.slots)
+        if self.slots[slot] != hour:
+            self.counts[slot] = 0
+            self.slots[slot] = hour
+        self.counts[slot, self._column[column]] += count
+
+    def merge(self, other):
+        newer = other.slots > self.slots
+        self.counts[newer] = other.counts[newer]
+        self.slots[newer] = other.slots[newer]
+        same = (other.slots == self.slots) & (other.slots > 0) & ~newer
+        self.counts[same] += other.counts[same]
+
+    def series(self, freq='D'):
+        """Counts per period and column, oldest first, as a DataFrame."""
+        used = self.slots > 0
+        frame = pd.DataFrame(self.counts[used], columns=self.columns,
+                             index=pd.to_datetime(self.slots[used] * HOUR, unit='s'))
+        return frame.sort_index().resample(freq).sum()
+
+
+class TrendSketches:
+    """
+    The aggregate state: count-min counts for every combination of category,
+    sentiment bucket and district, a HyperLogLog of distinct sessions (the
+    session id is only hashed into a register) and hourly counts per category.
+    Sketches of different workers or flushes are combined with `merge`.
+    """
+
+    def __init__(self, columns, count_min=None, sessions=None, buckets=None, total=0):
+        self.count_min = count_min or CountMinSketch()
+        self.sessions = sessions or HyperLogLog()
+        self.buckets = buckets or TimeBuckets(columns)
+        self.total = total
+
+    @classmethod
+    def for_catalog(cls, catalog=None):
+        catalog = catalog or load_catalog()
+        return cls([category.key for category in catalog.categories] + [NO_CATEGORY])
+
+    @staticmethod
+    def key(**values):
+        """Count-min key of a combination of field values, e.g. 'category=racist|district=Mitte'."""
+        return '|'.join(f"{field}={values[field]}" for field in FIELDS if values.get(field) is not None)
+
+    def record(self, category, sentiment, district=None, session_id=None, timestamp=None):
+        values = {'category': category or NO_CATEGORY, 'sentiment': sentiment or UNKNOWN,
+                  'district': district or UNKNOWN}
+        for fields in COMBINATIONS:
+            self.count_min.add('|'.join(f"{field}={values[field]}" for field in fields))
+        if session_id:
+            self.sessions.add(session_id)
+        column = values['category'] if values['category'] in self.buckets.columns else NO_CATEGORY
+        self.buckets.add(column, timestamp or time.time())
+        self.total += 1
+
+    def count(self, category=None, sentiment=None, district=None):
+        """Estimated classifications matching the given values; all of them without filters."""
+        key = self.key(category=category, sentiment=sentiment, district=district)
+        return self.count_min.estimate(key) if key else self.total
+
+    def merge(self, other):
+        self.count_min.merge(other.count_min)
+        self.sessions.merge(other.sessions)
+        self.buckets.merge(other.buckets)
+        self.total += other.total
+
+
+class TrendStore:
+    """
+    Sketches persisted in a local SQLite file. Every flush merges a delta into
+    the stored state in one write transaction, so several workers can share
+    the file.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS sketches (name TEXT PRIMARY KEY, data BLOB)")
+
+    def _read(self, columns):
+        rows = dict(self._db.execute("SELECT name, data FROM sketches"))
+        if 'meta' not in rows:
+            return TrendSketches(columns)
+        meta = json.loads(rows['meta'])
+        if list(columns) != meta['columns']:
+            raise ValueError(f"Stored trend columns {meta['columns']} do not match {list(columns)}")
+        return TrendSketches(
+            columns,
+            count_min=CountMinSketch(table=np.frombuffer(rows['count_min'], dtype=np.uint32)
+                                     .reshape(meta['count_min']).copy()),
+            sessions=HyperLogLog(meta['precision'], np.frombuffer(rows['sessions'], dtype=np.uint8).copy()),
+            buckets=TimeBuckets(columns,
+                                counts=np.frombuffer(rows['bucket_counts'], dtype=np.uint32)
+                                .reshape(meta['buckets']).copy(),
+                                slots=np.frombuffer(rows['bucket_slots'], dtype=np.int64).copy()),
+            total=meta['total'],
+        )
+
+    def load(self, columns=None):
+        """The stored sketches (empty ones when nothing was flushed yet)."""
+        columns = columns or TrendSketches.for_catalog().buckets.columns
+        with self._lock:
+            return self._read(columns)
+
+    def merge(self, delta):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                state = self._read(delta.buckets.columns)
+                state.merge(delta)
+                meta = {
+                    'columns': list(state.buckets.columns),
+                    'count_min': list(state.count_min.table.shape),
+                    'precision': state.sessions.precision,
+                    'buckets': list(state.buckets.counts.shape),
+                    'total': state.total,
+                    'updated': time.time(),
+                }
+                self._db.executemany("INSERT OR REPLACE INTO sketches (name, data) VALUES (?, ?)", [
+                    ('meta', json.dumps(meta)),
+                    ('count_min', state.count_min.table.tobytes()),
+                    ('sessions', state.sessions.registers.tobytes()),
+                    ('bucket_counts', state.buckets.counts.tobytes()),
+                    ('bucket_slots', state.buckets.slots.tobytes()),
+                ])
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        self._db.close()
+
+
+class TrendRecorder:
+    """
+    Records classifications into in-memory sketches and merges them into the
+    store every `interval` seconds from a background thread, so a request
+    only pays for a few hash updates.
+    """
+
+    def __init__(self, store, interval=60, catalog=None):
+        self.store = store
+        self.interval = interval
+        self._catalog = catalog
+        self._lock = threading.Lock()
+        self._delta = TrendSketches.for_catalog(catalog)
+        self.flushes = 0
+        self.failures = 0
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._run, name='trend-flusher', daemon=True)
+        self._flusher.start()
+
+    def record(self, category, sentiment, district=None, session_id=None, timestamp=None):
+        with self._lock:
+            self._delta.record(category, sentiment, district, session_id, timestamp)
+
+    def flush(self):
+        with self._lock:
+            delta, self._delta = self._delta, TrendSketches.for_catalog(self._catalog)
+        if delta.total:
+            self.store.merge(delta)
+            self.flushes += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as exc:
+                # The delta of this interval is lost; recording itself never fails a request
+                self.failures += 1
+                print(f"Trend flush failed: {exc}")
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
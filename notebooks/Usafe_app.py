@@ -1,4 +1,6 @@
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 import streamlit as st
@@ -60,6 +62,7 @@ with st.form(key="user_form"):
 def get_relevant_info_with_metadata(query, section_filter=None, k=5):
     """
     Retrieve relevant information with metadata filtering and return full content.
+    Runs on prefetch threads too, so it must not call Streamlit.
     """
     try:
         # Use metadata filtering if a section_filter is provided
@@ -73,16 +76,73 @@ def get_relevant_info_with_metadata(query, section_filter=None, k=5):
         if results:
             # Combine content from all retrieved documents
             full_content = " ".join([result.page_content.strip() for result in results if result.page_content])
-            
-            # DEBUG: Print the full content retrieved
-            st.write(f"Retrieved content: {full_content}")
-            
             return full_content if full_content else "No information available at the moment."
         
         return "No information found for the given query."
     except AttributeError as e:
-        st.error(f"Error during retrieval: {e}")
-        return "An error occurred while retrieving the information."
+        return f"An error occurred while retrieving the information: {e}"
+
+# Query (and optional section filter) behind each option of the selectbox
+OPTION_QUERIES = {
+    "Understanding Rights": ("What rights do victims of hate crimes have in Germany?", None),
+    "Steps to Report a Hate Crime in Berlin": ("Please provide a detailed step-by-step guide on reporting a hate crime in Germany, specifically Document the Incident, Preserve Evidence, Prepare language barrier, Visit the police station, report crime online, seek additional support.", "steps"),
+    "Local Resources in Berlin": ("What resources are available in Berlin for hate crime victims?", None),
+    "General Information": ("Provide general information about hate crimes.", None),
+}
+
+
+class PrefetchScheduler:
+    """
+    The option queries are constants, so their content is the same for every
+    user: each (query, section filter) is retrieved once per process, on a
+    small thread pool, as soon as the first hate crime type is detected, and
+    every later user finds it ready. A failed retrieval is retried on demand.
+    """
+
+    def __init__(self, max_workers=2):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._futures = {}   # (query, section_filter) -> future
+        self.hits = 0        # result was ready when asked for
+        self.waits = 0       # prefetch was still running and was awaited
+        self.misses = 0      # nothing prefetched, computed on demand
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def prefetch(self, options):
+        """Start retrieval for each option that is not cached or running yet."""
+        with self._lock:
+            for query_and_filter in options.values():
+                future = self._futures.get(query_and_filter)
+                if future is None or (future.done() and future.exception() is not None):
+                    self._futures[query_and_filter] = self._pool.submit(get_relevant_info_with_metadata, *query_and_filter)
+
+    def get(self, option):
+        query_and_filter = OPTION_QUERIES[option]
+        with self._lock:
+            future = self._futures.get(query_and_filter)
+        if future is not None and (not future.done() or future.exception() is None):
+            self._count('hits' if future.done() else 'waits')
+            return future.result()
+        self._count('misses')
+        with self._lock:
+            self._futures[query_and_filter] = future = self._pool.submit(get_relevant_info_with_metadata, *query_and_filter)
+        return future.result()
+
+    def hit_rate(self):
+        served = self.hits + self.waits + self.misses
+        return self.hits / served if served else 0.0
+
+
+@st.cache_resource
+def load_prefetch_scheduler():
+    return PrefetchScheduler()
+
+prefetcher = load_prefetch_scheduler()
+# Process-wide counters, so they are only shown to operators
+show_prefetch_stats = os.getenv('USAFE_DEBUG', '').lower() in ('1', 'true', 'yes', 'on')
 
 # Step 5: Handle form submission
 if submit_button:
@@ -113,6 +173,9 @@ if st.session_state['submitted'] and st.session_state['user_input']:
 
 # Step 8: Show the options dropdown only after the hate crime type is detected
     if hate_crime_type:
+        # Start fetching the content behind every option while the user is still reading
+        prefetcher.prefetch(OPTION_QUERIES)
+
         st.markdown("### How can I assist you further?")
         option = st.selectbox(
             "Choose one of the options below for more information:",
@@ -121,22 +184,21 @@ if st.session_state['submitted'] and st.session_state['user_input']:
         
         # Retrieve information based on the selected option
         if option != "Select...":
+            relevant_info = prefetcher.get(option)
             if option == "Understanding Rights":
-                option_query = "What rights do victims of hate crimes have in Germany?"
-                relevant_info = get_relevant_info_with_metadata(option_query)
                 st.markdown(f"### Understanding Your Rights\n{relevant_info if relevant_info else 'No information available at the moment.'}")
             
             elif option == "Steps to Report a Hate Crime in Berlin":
-                 option_query = "Please provide a detailed step-by-step guide on reporting a hate crime in Germany, specifically Document the Incident, Preserve Evidence, Prepare language barrier, Visit the police station, report crime online, seek additional support."
-                 relevant_info = get_relevant_info_with_metadata(option_query, section_filter="steps")
                  st.markdown(f"### Steps to Report a Hate Crime\n{relevant_info if relevant_info else 'No information available at the moment.'}")
             
             elif option == "Local Resources in Berlin":
-                option_query = "What resources are available in Berlin for hate crime victims?"
-                relevant_info = get_relevant_info_with_metadata(option_query)
                 st.markdown(f"### Local Resources in Berlin\n{relevant_info if relevant_info else 'No information available at the moment.'}")
             
             elif option == "General Information":
-                option_query = "Provide general information about hate crimes."
-                relevant_info = get_relevant_info_with_metadata(option_query)
-                st.markdown(f"### General Information\n{relevant_info if relevant_info else 'No information available at the moment.'}")
\ No newline at end of file
+                st.markdown(f"### General Information\n{relevant_info if relevant_info else 'No information available at the moment.'}")
+
+        if show_prefetch_stats:
+            st.sidebar.caption(
+                f"Prefetch: {prefetcher.hit_rate():.0%} hit rate "
+                f"({prefetcher.hits} ready, {prefetcher.waits} awaited, {prefetcher.misses} missed)"
+            )